@@ -2,35 +2,482 @@
 import json
 import os
 import hashlib
+import hmac
+import secrets
 import uuid
-import psycopg2
-import psycopg2.extras
+import base64
+import re
+import math
+from datetime import date, datetime, timedelta, time as dt_time
+from decimal import Decimal
+import time
+import random
+import select
+import threading
+import importlib
+import contextvars
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DB_POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.environ.get('DB_POOL_MAX', '4'))
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', '30'))
+DB_POOL_MAX_AGE = float(os.environ.get('DB_POOL_MAX_AGE', '600'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_conn_meta = {}
+_request = threading.local()
+
+psycopg2 = None
+
+def load_psycopg2():
+    """Драйвер импортируется при первом обращении к БД: health-check и кэшированные ответы его не трогают"""
+    global psycopg2
+    if psycopg2 is None:
+        importlib.import_module('psycopg2.extras')
+        importlib.import_module('psycopg2.pool')
+        psycopg2 = importlib.import_module('psycopg2')
+    return psycopg2
+
+def _get_pool():
+    """Пул соединений живёт между тёплыми вызовами функции; после fork создаётся заново"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _conn_meta.clear()
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX, os.environ['DATABASE_URL'],
+                    keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+                _pool_pid = os.getpid()
+    return _pool
+
+def _conn_alive(conn):
+    if conn.closed:
+        return False
+    meta = _conn_meta.get(id(conn))
+    now = time.monotonic()
+    if meta is None:
+        _conn_meta[id(conn)] = {'created': now, 'used': now}
+        return True
+    if now - meta['created'] > DB_POOL_MAX_AGE:
+        return False
+    if now - meta['used'] > DB_POOL_PING_AFTER:
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+    return True
+
+def _checkout():
+    pool = _get_pool()
+    for _ in range(DB_POOL_MAX + 1):
+        conn = pool.getconn()
+        if _conn_alive(conn):
+            return conn
+        _conn_meta.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError('Нет живых соединений с БД')
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '500'))
+QUERY_LOG_SAMPLE = float(os.environ.get('QUERY_LOG_SAMPLE', '0'))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '') == '1'
+
+SQL_STRING_LITERAL = re.compile(r"[Ee]?'(?:[^']|'')*'")
+SQL_NUMBER_LITERAL = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+SQL_LITERAL_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+SQL_ROW_LIST = re.compile(r"(\(\?(?:, \.\.\.)?\))(?:\s*,\s*\(\?(?:, \.\.\.)?\))+")
+
+def redact_sql(query):
+    """Текст запроса без значений: строки и числа заменяются на ?, в лог не попадают токены, хеши и персональные данные"""
+    query = SQL_STRING_LITERAL.sub('?', ' '.join(str(query).split()))
+    query = SQL_NUMBER_LITERAL.sub('?', query)
+    return SQL_ROW_LIST.sub(r'\1, ...', SQL_LITERAL_LIST.sub('?, ...', query))
+
+class RequestStats:
+    """Счётчики одного запроса: SQL-выражения, время в БД и на сериализацию"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = []
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+
+    def record(self, query, ms, rows):
+        self.db_ms += ms
+        sql = redact_sql(query)
+        self.statements.append({'sql': sql[:200], 'fingerprint': hashlib.sha1(sql.encode()).hexdigest()[:12], 'ms': round(ms, 2), 'rows': rows})
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+class InstrumentedCursor:
+    def __init__(self, cur, stats):
+        self.cur = cur
+        self.stats = stats
+
+    def execute(self, query, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self.cur.execute(query, *args, **kwargs)
+        finally:
+            self.stats.record(query, (time.perf_counter() - start) * 1000, self.cur.rowcount)
+
+    def __iter__(self):
+        return iter(self.cur)
+
+    def __getattr__(self, name):
+        return getattr(self.cur, name)
+
+_async_stats = contextvars.ContextVar('request_stats', default=None)
+
+def current_stats():
+    return _async_stats.get() or getattr(_request, 'stats', None)
+
+class RequestConnection:
+    """Соединение, общее для всего запроса: close() откатывает незакоммиченное, но не возвращает его в пул"""
+
+    def __init__(self, conn):
+        self.raw = conn
+
+    def cursor(self, *args, **kwargs):
+        cur = self.raw.cursor(*args, **kwargs)
+        stats = current_stats()
+        return InstrumentedCursor(cur, stats) if stats else cur
+
+    def commit(self):
+        start = time.perf_counter()
+        self.raw.commit()
+        stats = current_stats()
+        if stats:
+            stats.record('COMMIT', (time.perf_counter() - start) * 1000, -1)
+
+    def rollback(self):
+        if not self.raw.closed:
+            self.raw.rollback()
+
+    def close(self):
+        self.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
 
 def get_db():
-    return psycopg2.connect(os.environ['DATABASE_URL'])
+    load_psycopg2()
+    conn = getattr(_request, 'conn', None)
+    if conn is None or conn.raw.closed:
+        if conn is not None:
+            release_db()
+        if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise psycopg2.pool.PoolError('Все соединения пула заняты')
+        try:
+            conn = RequestConnection(_checkout())
+        except Exception:
+            _pool_slots.release()
+            raise
+        _request.conn = conn
+    return conn
+
+def release_db():
+    conn = getattr(_request, 'conn', None)
+    _request.conn = None
+    if conn is None:
+        return
+    raw = conn.raw
+    broken = raw.closed
+    if not broken:
+        try:
+            raw.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+    if broken:
+        _conn_meta.pop(id(raw), None)
+    else:
+        _conn_meta.setdefault(id(raw), {'created': time.monotonic()})['used'] = time.monotonic()
+    try:
+        _get_pool().putconn(raw, close=broken)
+    finally:
+        _pool_slots.release()
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', '310000'))
+PASSWORD_SCRYPT_N = int(os.environ.get('PASSWORD_SCRYPT_N', '16384'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+
+class Pbkdf2Hasher:
+    """pbkdf2_sha256$<итерации>$<соль>$<хеш>"""
+    algorithm = 'pbkdf2_sha256'
+
+    def __init__(self, iterations):
+        self.iterations = iterations
+
+    def encode(self, password, salt=None, iterations=None):
+        salt = salt or secrets.token_hex(16)
+        iterations = iterations or self.iterations
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations)
+        return '%s$%d$%s$%s' % (self.algorithm, iterations, salt, base64.b64encode(digest).decode())
+
+    def verify(self, password, encoded):
+        _, iterations, salt, _ = encoded.split('$', 3)
+        return hmac.compare_digest(self.encode(password, salt, int(iterations)), encoded)
+
+    def needs_rehash(self, encoded):
+        return int(encoded.split('$')[1]) != self.iterations
+
+class ScryptHasher:
+    """scrypt$<n>$<r>$<p>$<соль>$<хеш>"""
+    algorithm = 'scrypt'
+
+    def __init__(self, n, r=8, p=1):
+        self.n, self.r, self.p = n, r, p
+
+    def encode(self, password, salt=None, n=None, r=None, p=None):
+        salt = salt or secrets.token_hex(16)
+        n, r, p = n or self.n, r or self.r, p or self.p
+        digest = hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=256 * n * r + (1 << 20), dklen=32)
+        return '%s$%d$%d$%d$%s$%s' % (self.algorithm, n, r, p, salt, base64.b64encode(digest).decode())
+
+    def verify(self, password, encoded):
+        _, n, r, p, salt, _ = encoded.split('$', 5)
+        return hmac.compare_digest(self.encode(password, salt, int(n), int(r), int(p)), encoded)
+
+    def needs_rehash(self, encoded):
+        return [int(v) for v in encoded.split('$')[1:4]] != [self.n, self.r, self.p]
+
+class LegacySha256Hasher:
+    """Старый формат: несолёный SHA-256 в hex; при входе всегда перехешируется"""
+    algorithm = 'sha256'
+
+    def encode(self, password):
+        return hashlib.sha256(password.encode()).hexdigest()
+
+    def verify(self, password, encoded):
+        return hmac.compare_digest(self.encode(password), encoded)
+
+    def needs_rehash(self, encoded):
+        return True
+
+PASSWORD_HASHERS = {h.algorithm: h for h in (Pbkdf2Hasher(PASSWORD_PBKDF2_ITERATIONS), ScryptHasher(PASSWORD_SCRYPT_N), LegacySha256Hasher())}
+
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS)
+_dummy_hash = None
+
+def run_hashing(fn, *args):
+    """Ограничитель: не больше PASSWORD_HASH_WORKERS KDF одновременно на экземпляр, считается в потоке вызова"""
+    with _hash_slots:
+        return fn(*args)
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return run_hashing(PASSWORD_HASHERS[PASSWORD_HASHER].encode, password)
 
-def json_response(status, body, headers_extra=None):
-    h = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS', 'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Authorization'}
+def check_password(password, encoded):
+    """Возвращает (пароль верен, хеш нужно пересчитать текущим алгоритмом)"""
+    hasher = PASSWORD_HASHERS.get(encoded.split('$', 1)[0] if '$' in encoded else 'sha256')
+    if hasher is None:
+        return False, False
+    ok = run_hashing(hasher.verify, password, encoded)
+    return ok, ok and (hasher.algorithm != PASSWORD_HASHER or hasher.needs_rehash(encoded))
+
+def burn_password_check(password):
+    """Та же работа, что и при проверке, когда пользователя нет — время ответа не выдаёт существование email"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password(uuid.uuid4().hex)
+    check_password(password, _dummy_hash)
+
+def raw_response(status, body, headers_extra=None):
+    h = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*', 'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS', 'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Authorization, If-None-Match', 'Access-Control-Expose-Headers': 'ETag, Server-Timing'}
     if headers_extra:
         h.update(headers_extra)
-    return {'statusCode': status, 'headers': h, 'body': json.dumps(body, default=str)}
+    return {'statusCode': status, 'headers': h, 'body': body}
+
+JSON_ENCODERS = {
+    Decimal: str,
+    datetime: str,
+    date: str,
+    dt_time: str,
+}
+
+def encode_default(value):
+    encoder = JSON_ENCODERS.get(type(value))
+    if encoder is None:
+        raise TypeError('Тип %s не сериализуется в JSON' % type(value).__name__)
+    return encoder(value)
+
+def dumps(body):
+    """Строки курсора идут в кодировщик как есть; orjson используется, если установлен"""
+    if orjson is not None:
+        return orjson.dumps(body, default=encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode()
+    return json.dumps(body, default=encode_default, ensure_ascii=False, separators=(',', ':'))
+
+def json_response(status, body, headers_extra=None):
+    start = time.perf_counter()
+    encoded = dumps(body)
+    stats = current_stats()
+    if stats:
+        stats.serialize_ms += (time.perf_counter() - start) * 1000
+    return raw_response(status, encoded, headers_extra)
+
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', '300'))
+CATALOG_CACHE_SIZE = int(os.environ.get('CATALOG_CACHE_SIZE', '256'))
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=60, stale-while-revalidate=300')
+# Ответы со свободными слотами (карточка услуги, календарь) меняются при каждой брони:
+# браузер всегда перепроверяет ETag, а в процессе они не хранятся — инвалидация не видна другим инстансам
+CATALOG_LIVE_TTL = float(os.environ.get('CATALOG_LIVE_TTL', '0'))
+CATALOG_LIVE_CACHE_CONTROL = 'no-cache'
+
+_catalog = OrderedDict()
+_catalog_lock = threading.Lock()
+
+def catalog_key(req, route):
+    return (route, tuple(sorted((k, str(v)) for k, v in req.params.items() if k != 'route')))
+
+def catalog_get(key):
+    with _catalog_lock:
+        entry = _catalog.get(key)
+        if entry and entry[0] < time.monotonic():
+            del _catalog[key]
+            entry = None
+    return entry
+
+def catalog_put(key, body, live=False):
+    ttl = CATALOG_LIVE_TTL if live else CATALOG_CACHE_TTL
+    entry = (time.monotonic() + ttl, body, '"%s"' % hashlib.sha1(body.encode()).hexdigest(), CATALOG_LIVE_CACHE_CONTROL if live else CATALOG_CACHE_CONTROL)
+    if ttl <= 0:
+        return entry
+    with _catalog_lock:
+        _catalog[key] = entry
+        while len(_catalog) > CATALOG_CACHE_SIZE:
+            _catalog.popitem(last=False)
+    return entry
+
+def catalog_response(req, route, build, live=False):
+    """Публичный GET каталога: кэш по маршруту и параметрам, сильный ETag и 304 на If-None-Match; live — ответ со слотами"""
+    key = catalog_key(req, route)
+    entry = catalog_get(key)
+    if entry is None:
+        resp = build()
+        if resp['statusCode'] != 200:
+            return resp
+        entry = catalog_put(key, resp['body'], live)
+    return catalog_reply(req, entry)
+
+def catalog_reply(req, entry):
+    if_none_match = req.header('If-None-Match')
+    cache_headers = {'ETag': entry[2], 'Cache-Control': entry[3]}
+    if if_none_match and (if_none_match.strip() == '*' or entry[2] in [t.strip() for t in if_none_match.split(',')]):
+        return raw_response(304, '', cache_headers)
+    return raw_response(200, entry[1], cache_headers)
+
+def invalidate_catalog(*routes):
+    with _catalog_lock:
+        for key in [k for k in _catalog if not routes or k[0] in routes]:
+            del _catalog[key]
+
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', '60'))
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '1000'))
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+def get_cached_session(token):
+    with _sessions_lock:
+        entry = _sessions.get(token)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _sessions[token]
+            return None
+        _sessions.move_to_end(token)
+        return dict(entry[1])
+
+def cache_session(token, user):
+    with _sessions_lock:
+        _sessions[token] = (time.monotonic() + SESSION_CACHE_TTL, dict(user))
+        _sessions.move_to_end(token)
+        while len(_sessions) > SESSION_CACHE_SIZE:
+            _sessions.popitem(last=False)
+
+def invalidate_user_sessions(user_id):
+    """Сбрасывает кэш после изменения строки пользователя (вход, профиль, роль)"""
+    with _sessions_lock:
+        for token in [t for t, entry in _sessions.items() if entry[1]['id'] == user_id]:
+            del _sessions[token]
 
 def get_user_by_token(token):
     if not token:
         return None
     token = token.replace('Bearer ', '')
+    user = get_cached_session(token)
+    if user:
+        return user
     conn = get_db()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     cur.execute("SELECT id, email, name, phone, role, lang, theme FROM users WHERE token = '%s'" % token.replace("'", "''"))
     user = cur.fetchone()
     conn.close()
-    return dict(user) if user else None
+    if not user:
+        return None
+    user = dict(user)
+    cache_session(token, user)
+    return user
+
+class Request:
+    """Событие, разобранное один раз: метод, маршрут, параметры и токен; тело и пользователь — по первому обращению"""
+    def __init__(self, event, body=None, parent=None):
+        self.event = event
+        self.parent = parent
+        self.method = event.get('httpMethod', 'GET')
+        self.params = event.get('queryStringParameters', {}) or {}
+        self.route = self.params.get('route', '')
+        self.headers = event.get('headers', {}) or {}
+        self.token = self.header('X-Authorization').replace('Bearer ', '')
+        self._body = body
+        self._user = False
+        self._user_lock = threading.Lock()
+
+    def header(self, name):
+        return self.headers.get(name, '') or self.headers.get(name.lower(), '')
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = json.loads(self.event.get('body', '{}') or '{}')
+        return self._body
+
+    @property
+    def user(self):
+        """Пользователь по токену; подзапросы batch берут его у родительского запроса — одна проверка на весь batch"""
+        if self._user is False:
+            with self._user_lock:
+                if self._user is False:
+                    self._user = self.parent.user if self.parent else get_user_by_token(self.token)
+        return self._user
+
+ROUTES = {}
+
+def api_route(path):
+    """Регистрирует обработчик маршрута; 'auth/*' — все маршруты с префиксом auth/"""
+    def register(fn):
+        ROUTES[path] = fn
+        return fn
+    return register
 
-def handle_auth(event, action):
-    body = json.loads(event.get('body', '{}') or '{}')
+@api_route('auth/*')
+def handle_auth(req):
+    action = req.route.split('/', 1)[1]
+    body = req.body
     
     if action == 'register':
         email = body.get('email', '').strip().lower()
@@ -38,16 +485,16 @@ def handle_auth(event, action):
         name = body.get('name', '')
         if not email or not password:
             return json_response(400, {'error': 'Email и пароль обязательны'})
+        token = uuid.uuid4().hex
+        pw_hash = hash_password(password)
         conn = get_db()
         cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute("SELECT id FROM users WHERE email = '%s'" % email.replace("'", "''"))
-        if cur.fetchone():
+        cur.execute("INSERT INTO users (email, password_hash, name, token) VALUES ('%s', '%s', '%s', '%s') ON CONFLICT (email) DO NOTHING RETURNING id, email, name, role, lang, theme" % (email.replace("'", "''"), pw_hash, name.replace("'", "''"), token))
+        user = cur.fetchone()
+        if not user:
             conn.close()
             return json_response(400, {'error': 'Пользователь уже зарегистрирован'})
-        token = uuid.uuid4().hex
-        pw_hash = hash_password(password)
-        cur.execute("INSERT INTO users (email, password_hash, name, token) VALUES ('%s', '%s', '%s', '%s') RETURNING id, email, name, role, lang, theme" % (email.replace("'", "''"), pw_hash, name.replace("'", "''"), token))
-        user = dict(cur.fetchone())
+        user = dict(user)
         conn.commit()
         conn.close()
         user['token'] = token
@@ -58,32 +505,39 @@ def handle_auth(event, action):
         password = body.get('password', '')
         if not email or not password:
             return json_response(400, {'error': 'Email и пароль обязательны'})
-        pw_hash = hash_password(password)
         conn = get_db()
         cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute("SELECT id, email, name, role, lang, theme FROM users WHERE email = '%s' AND password_hash = '%s'" % (email.replace("'", "''"), pw_hash))
+        cur.execute("SELECT id, email, name, role, lang, theme, password_hash FROM users WHERE email = '%s'" % email.replace("'", "''"))
         user = cur.fetchone()
+        release_db()
         if not user:
-            conn.close()
+            burn_password_check(password)
             return json_response(401, {'error': 'Неверный email или пароль'})
         user = dict(user)
+        ok, rehash = check_password(password, user.pop('password_hash'))
+        if not ok:
+            return json_response(401, {'error': 'Неверный email или пароль'})
         token = uuid.uuid4().hex
-        cur.execute("UPDATE users SET token = '%s' WHERE id = %d" % (token, user['id']))
+        updates = "token = '%s'" % token
+        if rehash:
+            updates += ", password_hash = '%s'" % hash_password(password)
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute("UPDATE users SET %s WHERE id = %d" % (updates, user['id']))
         conn.commit()
         conn.close()
+        invalidate_user_sessions(user['id'])
         user['token'] = token
         return json_response(200, {'user': user})
     
     if action == 'me':
-        auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
-        user = get_user_by_token(auth)
+        user = req.user
         if not user:
             return json_response(401, {'error': 'Не авторизован'})
         return json_response(200, {'user': user})
     
     if action == 'update-profile':
-        auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
-        user = get_user_by_token(auth)
+        user = req.user
         if not user:
             return json_response(401, {'error': 'Не авторизован'})
         name = body.get('name', user['name'])
@@ -95,30 +549,33 @@ def handle_auth(event, action):
         cur.execute("UPDATE users SET name='%s', phone='%s', lang='%s', theme='%s' WHERE id=%d" % (name.replace("'","''"), phone.replace("'","''"), lang, theme, user['id']))
         conn.commit()
         conn.close()
+        invalidate_user_sessions(user['id'])
         return json_response(200, {'success': True})
     
     return json_response(404, {'error': 'Not found'})
 
-def handle_categories(event, method):
-    auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
-    
-    if method == 'GET':
-        conn = get_db()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute("SELECT * FROM categories ORDER BY sort_order, id")
-        cats = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return json_response(200, {'categories': cats})
+def list_categories():
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("SELECT * FROM categories ORDER BY sort_order, id")
+    cats = cur.fetchall()
+    conn.close()
+    return json_response(200, {'categories': cats})
+
+@api_route('categories')
+def handle_categories(req):
+    if req.method == 'GET':
+        return catalog_response(req, 'categories', list_categories)
     
-    user = get_user_by_token(auth)
+    user = req.user
     if not user or user['role'] != 'admin':
         return json_response(403, {'error': 'Нет доступа'})
     
-    body = json.loads(event.get('body', '{}') or '{}')
+    body = req.body
     conn = get_db()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     
-    if method == 'POST':
+    if req.method == 'POST':
         name = body.get('name', '')
         if not name:
             conn.close()
@@ -127,9 +584,10 @@ def handle_categories(event, method):
         cat = dict(cur.fetchone())
         conn.commit()
         conn.close()
+        invalidate_catalog()
         return json_response(200, {'category': cat})
     
-    if method == 'DELETE':
+    if req.method == 'DELETE':
         cat_id = body.get('id')
         if not cat_id:
             conn.close()
@@ -143,92 +601,324 @@ def handle_categories(event, method):
         cur.execute("DELETE FROM categories WHERE id = %d AND is_default = FALSE" % int(cat_id))
         conn.commit()
         conn.close()
+        invalidate_catalog()
         return json_response(200, {'success': True})
     
     conn.close()
     return json_response(404, {'error': 'Not found'})
 
-def handle_services(event, method):
-    auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
+def service_detail_queries(service_id):
+    """Три независимых запроса карточки услуги: сама услуга, будущие окошки, похожие услуги"""
+    return (
+        "SELECT %s FROM services s LEFT JOIN categories c ON s.category_id = c.id WHERE s.id = %d" % (', '.join(SERVICE_COLUMNS[f] for f in SERVICE_DEFAULT_FIELDS), service_id),
+        "SELECT id, service_id, slot_date, to_char(slot_time, 'HH24:MI') AS slot_time, is_booked, created_at FROM service_slots WHERE service_id = %d AND slot_date >= CURRENT_DATE ORDER BY slot_date, slot_time" % service_id,
+        "SELECT s.id, s.name, s.price, s.photos FROM services s WHERE s.category_id = (SELECT category_id FROM services WHERE id = %d) AND s.id != %d LIMIT 4" % (service_id, service_id),
+    )
+
+def get_service(service_id):
+    service_sql, slots_sql, related_sql = service_detail_queries(service_id)
     conn = get_db()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    params = event.get('queryStringParameters', {}) or {}
+    cur.execute(service_sql)
+    svc = cur.fetchone()
+    if not svc:
+        conn.close()
+        return json_response(404, {'error': 'Услуга не найдена'})
+    svc = dict(svc)
+    cur.execute(slots_sql)
+    svc['slots'] = cur.fetchall()
+    cur.execute(related_sql)
+    svc['related'] = cur.fetchall()
+    conn.close()
+    return json_response(200, {'service': svc})
+
+SERVICE_COLUMNS = {
+    'id': 's.id',
+    'name': 's.name',
+    'description': 's.description',
+    'price': 's.price',
+    'category_id': 's.category_id',
+    'category_name': 'c.name AS category_name',
+    'photos': 's.photos',
+    'photo': "s.photos::json->>0 AS photo",
+    'is_popular': 's.is_popular',
+    'created_at': 's.created_at',
+}
+SERVICE_DEFAULT_FIELDS = [f for f in SERVICE_COLUMNS if f != 'photo']
+SERVICE_CARD_FIELDS = ['id', 'name', 'price', 'category_id', 'category_name', 'photo']
+SERVICE_ROW = 'id, category_id, name, description, price, photos, is_popular, created_at'
+SEARCH_VECTOR_SQL = "setweight(to_tsvector('russian', %s), 'A') || setweight(to_tsvector('russian', %s), 'B')"
+SERVICE_SORTS = {
+    'new': (['created_at', 'id'], 'DESC'),
+    'cheap': (['price', 'id'], 'ASC'),
+    'expensive': (['price', 'id'], 'DESC'),
+    'popular': (['is_popular', 'created_at', 'id'], 'DESC'),
+}
+SERVICES_PAGE_SIZE = 24
+SERVICES_PAGE_MAX = 100
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+def sql_literal(column, value):
+    """Значение курсора как безопасный SQL-литерал нужного типа"""
+    if column == 'id':
+        return str(int(value))
+    if column == 'price':
+        return str(Decimal(str(value)))
+    if column == 'is_popular':
+        return 'TRUE' if value else 'FALSE'
+    if column == 'created_at':
+        return "'%s'::timestamp" % datetime.fromisoformat(value).isoformat(' ')
+    raise ValueError(column)
+
+def list_services(params):
+    cat_id = params.get('category_id', '')
+    sort = params.get('sort', 'new')
+    keys, direction = SERVICE_SORTS.get(sort, SERVICE_SORTS['new'])
+    order = ', '.join('s.%s %s' % (k, direction) for k in keys)
+    
+    if params.get('view') == 'card':
+        fields = SERVICE_CARD_FIELDS
+    elif params.get('fields'):
+        fields = [f for f in params['fields'].split(',') if f in SERVICE_COLUMNS]
+        if not fields:
+            return json_response(400, {'error': 'Неизвестные поля'})
+    else:
+        fields = SERVICE_DEFAULT_FIELDS
+    columns = [SERVICE_COLUMNS[f] for f in fields] + ['s.%s AS _k_%s' % (k, k) for k in keys]
+    
+    where = []
+    if cat_id:
+        where.append("s.category_id = %d" % int(cat_id))
+    paginate = bool(params.get('limit') or params.get('cursor') or params.get('view'))
+    limit = ''
+    if paginate:
+        page_size = min(max(int(params.get('limit') or SERVICES_PAGE_SIZE), 1), SERVICES_PAGE_MAX)
+        limit = 'LIMIT %d' % (page_size + 1)
+        if params.get('cursor'):
+            try:
+                values = decode_cursor(params['cursor'])
+                literals = [sql_literal(k, v) for k, v in zip(keys, values)]
+            except (ValueError, TypeError, ArithmeticError):
+                return json_response(400, {'error': 'Некорректный курсор'})
+            if len(literals) != len(keys):
+                return json_response(400, {'error': 'Некорректный курсор'})
+            where.append("(%s) %s (%s)" % (', '.join('s.' + k for k in keys), '>' if direction == 'ASC' else '<', ', '.join(literals)))
     
-    if method == 'GET':
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("SELECT %s FROM services s LEFT JOIN categories c ON s.category_id = c.id %s ORDER BY %s %s" % (', '.join(columns), ('WHERE ' + ' AND '.join(where)) if where else '', order, limit))
+    rows = cur.fetchall()
+    conn.close()
+    
+    next_cursor = None
+    if paginate and len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor([rows[-1]['_k_' + k] for k in keys])
+    for r in rows:
+        for k in keys:
+            r.pop('_k_' + k, None)
+    result = {'services': rows}
+    if paginate:
+        result['next_cursor'] = next_cursor
+    return json_response(200, result)
+
+SLOTS_MAX = 2000
+
+def parse_slot_time(value):
+    for fmt in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            pass
+    raise ValueError(value)
+
+def generate_slots(schedule):
+    """Окошки по расписанию: дни недели (1 — пн … 7 — вс), рабочие часы, шаг в минутах, диапазон дат"""
+    date_from = date.fromisoformat(schedule['date_from'])
+    date_to = date.fromisoformat(schedule['date_to'])
+    weekdays = set(int(d) for d in schedule.get('weekdays', [1, 2, 3, 4, 5]))
+    start = datetime.combine(date_from, parse_slot_time(schedule.get('start', '10:00')))
+    end = datetime.combine(date_from, parse_slot_time(schedule.get('end', '18:00')))
+    interval = timedelta(minutes=int(schedule.get('interval', 60)))
+    if interval < timedelta(minutes=5) or date_to < date_from:
+        raise ValueError('schedule')
+    times = []
+    t = start
+    while t + interval <= end:
+        times.append(t.time())
+        t += interval
+    slots = []
+    day = date_from
+    while day <= date_to:
+        if day.isoweekday() in weekdays:
+            slots.extend((day, slot_time) for slot_time in times)
+            if len(slots) > SLOTS_MAX:
+                raise ValueError('too many slots')
+        day += timedelta(days=1)
+    if not slots:
+        raise ValueError('empty schedule')
+    return slots
+
+def requested_slots(body):
+    """Итоговый набор окошек услуги из явного списка slots и/или расписания schedule"""
+    slots = set()
+    for slot in body.get('slots', []) or []:
+        if slot.get('date') and slot.get('time'):
+            slots.add((date.fromisoformat(slot['date']), parse_slot_time(slot['time'])))
+    if body.get('schedule'):
+        slots.update(generate_slots(body['schedule']))
+    if len(slots) > SLOTS_MAX:
+        raise ValueError('too many slots')
+    return slots
+
+def insert_slots(cur, service_id, slots):
+    if not slots:
+        return
+    values = ', '.join("(%d, '%s', '%s')" % (service_id, d.isoformat(), t.strftime('%H:%M')) for d, t in sorted(slots))
+    cur.execute("INSERT INTO service_slots (service_id, slot_date, slot_time) VALUES %s" % values)
+
+def sync_slots(cur, service_id, slots):
+    """Применяет только разницу: лишние свободные окошки удаляются, недостающие добавляются, занятые не трогаются"""
+    cur.execute("SELECT id, slot_date, slot_time, is_booked FROM service_slots WHERE service_id = %d ORDER BY is_booked DESC, id" % service_id)
+    present = set()
+    stale = []
+    for r in cur.fetchall():
+        key = (r['slot_date'], r['slot_time'])
+        if r['is_booked'] or (key in slots and key not in present):
+            present.add(key)
+        else:
+            stale.append(r['id'])
+    if stale:
+        cur.execute("DELETE FROM service_slots WHERE id IN (%s) AND is_booked = FALSE" % ', '.join(str(i) for i in stale))
+    missing = slots - present
+    insert_slots(cur, service_id, missing)
+    return len(missing), len(stale)
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 50
+
+def search_services(params):
+    """Полнотекстовый поиск с русской морфологией, фильтром по цене и фасетами по разделам"""
+    where = []
+    q = params.get('q', '').strip()
+    rank = '0'
+    if q:
+        tsquery = "websearch_to_tsquery('russian', '%s')" % q.replace("'", "''")
+        where.append("s.search_vector @@ %s" % tsquery)
+        rank = "ts_rank_cd(s.search_vector, %s)" % tsquery
+    for param, op in (('price_min', '>='), ('price_max', '<=')):
+        if params.get(param):
+            try:
+                price = Decimal(params[param])
+            except ArithmeticError:
+                price = None
+            if price is None or not price.is_finite():
+                return json_response(400, {'error': 'Некорректная цена'})
+            where.append("s.price %s %s" % (op, price))
+    page_size = min(max(int(params.get('limit') or SEARCH_PAGE_SIZE), 1), SEARCH_PAGE_MAX)
+    offset = max(int(params.get('offset') or 0), 0)
+    
+    results_where = list(where)
+    if params.get('category_id'):
+        results_where.append("s.category_id = %d" % int(params['category_id']))
+    
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("SELECT %s, %s AS rank FROM services s LEFT JOIN categories c ON s.category_id = c.id %s ORDER BY rank DESC, s.created_at DESC, s.id DESC LIMIT %d OFFSET %d" % (
+        ', '.join(SERVICE_COLUMNS[f] for f in SERVICE_CARD_FIELDS), rank,
+        ('WHERE ' + ' AND '.join(results_where)) if results_where else '', page_size, offset))
+    services = cur.fetchall()
+    cur.execute("SELECT s.category_id, c.name AS category_name, COUNT(*) AS count, MIN(s.price) AS price_min, MAX(s.price) AS price_max FROM services s LEFT JOIN categories c ON s.category_id = c.id %s GROUP BY s.category_id, c.name ORDER BY count DESC, c.name" % (
+        ('WHERE ' + ' AND '.join(where)) if where else ''))
+    facets = cur.fetchall()
+    conn.close()
+    
+    if params.get('category_id'):
+        matched = [f for f in facets if f['category_id'] == int(params['category_id'])]
+    else:
+        matched = facets
+    return json_response(200, {
+        'services': services,
+        'total': sum(f['count'] for f in matched),
+        'categories': facets,
+        'price': {
+            'min': min((f['price_min'] for f in matched), default=None),
+            'max': max((f['price_max'] for f in matched), default=None),
+        },
+    })
+
+@api_route('search')
+def handle_search(req):
+    if req.method != 'GET':
+        return json_response(404, {'error': 'Not found'})
+    return catalog_response(req, 'search', lambda: search_services(req.params))
+
+@api_route('services')
+def handle_services(req):
+    params = req.params
+    
+    if req.method == 'GET':
         service_id = params.get('id', '')
         if service_id:
-            cur.execute("SELECT s.*, c.name as category_name FROM services s LEFT JOIN categories c ON s.category_id = c.id WHERE s.id = %d" % int(service_id))
-            svc = cur.fetchone()
-            if not svc:
-                conn.close()
-                return json_response(404, {'error': 'Услуга не найдена'})
-            svc = dict(svc)
-            cur.execute("SELECT * FROM service_slots WHERE service_id = %d ORDER BY slot_date, slot_time" % int(service_id))
-            svc['slots'] = [dict(r) for r in cur.fetchall()]
-            cur.execute("SELECT s.id, s.name, s.price, s.photos FROM services s WHERE s.category_id = %d AND s.id != %d LIMIT 4" % (svc.get('category_id') or 0, int(service_id)))
-            svc['related'] = [dict(r) for r in cur.fetchall()]
-            conn.close()
-            return json_response(200, {'service': svc})
-        
-        cat_id = params.get('category_id', '')
-        sort = params.get('sort', 'new')
-        order = 'created_at DESC'
-        if sort == 'cheap':
-            order = 'price ASC'
-        elif sort == 'expensive':
-            order = 'price DESC'
-        elif sort == 'popular':
-            order = 'is_popular DESC, created_at DESC'
-        
-        where = ''
-        if cat_id:
-            where = "WHERE s.category_id = %d" % int(cat_id)
-        
-        cur.execute("SELECT s.*, c.name as category_name FROM services s LEFT JOIN categories c ON s.category_id = c.id %s ORDER BY %s" % (where, order))
-        svcs = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return json_response(200, {'services': svcs})
+            return catalog_response(req, 'services/detail', lambda: get_service(int(service_id)), live=True)
+        return catalog_response(req, 'services', lambda: list_services(params))
     
-    user = get_user_by_token(auth)
+    user = req.user
     if not user or user['role'] != 'admin':
-        conn.close()
         return json_response(403, {'error': 'Нет доступа'})
     
-    body = json.loads(event.get('body', '{}') or '{}')
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    body = req.body
     
-    if method == 'POST':
+    if req.method == 'POST':
         name = body.get('name', '')
         description = body.get('description', '')
         price = body.get('price', 0)
         category_id = body.get('category_id')
         photos = json.dumps(body.get('photos', []))
         is_popular = body.get('is_popular', False)
-        slots = body.get('slots', [])
         
         if not name or not price:
             conn.close()
             return json_response(400, {'error': 'Название и цена обязательны'})
+        try:
+            slots = requested_slots(body)
+        except (ValueError, KeyError, TypeError):
+            conn.close()
+            return json_response(400, {'error': 'Некорректные окошки или расписание'})
         
         cat_part = "NULL" if not category_id else str(int(category_id))
         pop = 'TRUE' if is_popular else 'FALSE'
-        cur.execute("INSERT INTO services (name, description, price, category_id, photos, is_popular) VALUES ('%s', '%s', %s, %s, '%s', %s) RETURNING *" % (name.replace("'","''"), description.replace("'","''"), float(price), cat_part, photos.replace("'","''"), pop))
+        name_sql = "'%s'" % name.replace("'","''")
+        description_sql = "'%s'" % description.replace("'","''")
+        cur.execute("INSERT INTO services (name, description, price, category_id, photos, is_popular, search_vector) VALUES (%s, %s, %s, %s, '%s', %s, %s) RETURNING %s" % (name_sql, description_sql, float(price), cat_part, photos.replace("'","''"), pop, SEARCH_VECTOR_SQL % (name_sql, description_sql), SERVICE_ROW))
         svc = dict(cur.fetchone())
         
-        for slot in slots:
-            slot_date = slot.get('date', '')
-            slot_time = slot.get('time', '')
-            if slot_date and slot_time:
-                cur.execute("INSERT INTO service_slots (service_id, slot_date, slot_time) VALUES (%d, '%s', '%s')" % (svc['id'], slot_date, slot_time))
+        insert_slots(cur, svc['id'], slots)
         
         conn.commit()
         conn.close()
+        invalidate_catalog()
         return json_response(200, {'service': svc})
     
-    if method == 'PUT':
+    if req.method == 'PUT':
         svc_id = body.get('id')
         if not svc_id:
             conn.close()
             return json_response(400, {'error': 'ID обязателен'})
+        slots = None
+        if 'slots' in body or 'schedule' in body:
+            try:
+                slots = requested_slots(body)
+            except (ValueError, KeyError, TypeError):
+                conn.close()
+                return json_response(400, {'error': 'Некорректные окошки или расписание'})
         updates = []
         if 'name' in body:
             updates.append("name='%s'" % body['name'].replace("'","''"))
@@ -242,22 +932,23 @@ def handle_services(event, method):
             updates.append("photos='%s'" % json.dumps(body['photos']).replace("'","''"))
         if 'is_popular' in body:
             updates.append("is_popular=%s" % ('TRUE' if body['is_popular'] else 'FALSE'))
+        if 'name' in body or 'description' in body:
+            name_sql = "'%s'" % body['name'].replace("'","''") if 'name' in body else "coalesce(name, '')"
+            description_sql = "'%s'" % body['description'].replace("'","''") if 'description' in body else "coalesce(description, '')"
+            updates.append("search_vector=" + SEARCH_VECTOR_SQL % (name_sql, description_sql))
         if updates:
             cur.execute("UPDATE services SET %s WHERE id = %d" % (', '.join(updates), int(svc_id)))
         
-        if 'slots' in body:
-            cur.execute("DELETE FROM service_slots WHERE service_id = %d AND is_booked = FALSE" % int(svc_id))
-            for slot in body['slots']:
-                slot_date = slot.get('date', '')
-                slot_time = slot.get('time', '')
-                if slot_date and slot_time:
-                    cur.execute("INSERT INTO service_slots (service_id, slot_date, slot_time) VALUES (%d, '%s', '%s')" % (int(svc_id), slot_date, slot_time))
+        result = {'success': True}
+        if slots is not None:
+            result['slots_added'], result['slots_removed'] = sync_slots(cur, int(svc_id), slots)
         
         conn.commit()
         conn.close()
-        return json_response(200, {'success': True})
+        invalidate_catalog()
+        return json_response(200, result)
     
-    if method == 'DELETE':
+    if req.method == 'DELETE':
         svc_id = body.get('id')
         if not svc_id:
             conn.close()
@@ -268,32 +959,105 @@ def handle_services(event, method):
         cur.execute("DELETE FROM services WHERE id = %d" % int(svc_id))
         conn.commit()
         conn.close()
+        invalidate_catalog()
         return json_response(200, {'success': True})
     
     conn.close()
     return json_response(404, {'error': 'Not found'})
 
-def handle_bookings(event, method):
-    auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
-    user = get_user_by_token(auth)
+BOOKINGS_PAGE_SIZE = 50
+BOOKINGS_PAGE_MAX = 200
+
+def booking_filters(params):
+    """Фильтры ленты и сводки бронирований: статус, услуга, диапазон дат окошка"""
+    where = []
+    if params.get('status'):
+        where.append("b.status = '%s'" % params['status'].replace("'", "''"))
+    if params.get('service_id'):
+        where.append("b.service_id = %d" % int(params['service_id']))
+    if params.get('date_from'):
+        where.append("ss.slot_date >= '%s'" % date.fromisoformat(params['date_from']).isoformat())
+    if params.get('date_to'):
+        where.append("ss.slot_date <= '%s'" % date.fromisoformat(params['date_to']).isoformat())
+    return where
+
+@api_route('bookings/summary')
+def handle_bookings_summary(req):
+    """Сводка для дашборда: количество и выручка по дням и статусам одним агрегирующим запросом"""
+    user = req.user
+    if not user or user['role'] != 'admin':
+        return json_response(403, {'error': 'Нет доступа'})
+    if req.method != 'GET':
+        return json_response(404, {'error': 'Not found'})
+    params = req.params
+    try:
+        where = booking_filters(params)
+    except ValueError:
+        return json_response(400, {'error': 'Некорректный фильтр'})
     
-    if method == 'GET':
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("SELECT ss.slot_date AS day, b.status, COUNT(*) AS count, COALESCE(SUM(s.price), 0) AS revenue, GROUPING(ss.slot_date, b.status) AS grouping_id FROM bookings b LEFT JOIN services s ON b.service_id = s.id LEFT JOIN service_slots ss ON b.slot_id = ss.id %s GROUP BY GROUPING SETS ((ss.slot_date, b.status), (ss.slot_date), (b.status), ()) ORDER BY ss.slot_date NULLS LAST, b.status" % (('WHERE ' + ' AND '.join(where)) if where else ''))
+    rows = cur.fetchall()
+    conn.close()
+    
+    days = OrderedDict()
+    statuses = {}
+    total = {'count': 0, 'revenue': 0}
+    for r in rows:
+        counts = {'count': r['count'], 'revenue': r['revenue']}
+        if r['grouping_id'] == 0:
+            days.setdefault(r['day'], {'date': r['day'], 'statuses': {}})['statuses'][r['status']] = counts
+        elif r['grouping_id'] == 1:
+            days.setdefault(r['day'], {'date': r['day'], 'statuses': {}}).update(counts)
+        elif r['grouping_id'] == 2:
+            statuses[r['status']] = counts
+        else:
+            total = counts
+    return json_response(200, {'days': list(days.values()), 'statuses': statuses, 'total': total})
+
+@api_route('bookings')
+def handle_bookings(req):
+    user = req.user
+    
+    if req.method == 'GET':
         if not user:
             return json_response(401, {'error': 'Не авторизован'})
+        params = req.params
+        try:
+            where = booking_filters(params)
+        except ValueError:
+            return json_response(400, {'error': 'Некорректный фильтр'})
+        if user['role'] != 'admin':
+            where.append("b.user_id = %d" % user['id'])
+        paginate = user['role'] == 'admin' or bool(params.get('limit') or params.get('cursor'))
+        limit = ''
+        if paginate:
+            page_size = min(max(int(params.get('limit') or BOOKINGS_PAGE_SIZE), 1), BOOKINGS_PAGE_MAX)
+            limit = 'LIMIT %d' % (page_size + 1)
+            if params.get('cursor'):
+                try:
+                    last_at, last_id = decode_cursor(params['cursor'])
+                    where.append("(b.created_at, b.id) < (%s, %s)" % (sql_literal('created_at', last_at), sql_literal('id', last_id)))
+                except (ValueError, TypeError):
+                    return json_response(400, {'error': 'Некорректный курсор'})
         conn = get_db()
         cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        if user['role'] == 'admin':
-            cur.execute("SELECT b.*, s.name as service_name, ss.slot_date, ss.slot_time FROM bookings b LEFT JOIN services s ON b.service_id = s.id LEFT JOIN service_slots ss ON b.slot_id = ss.id ORDER BY b.created_at DESC")
-        else:
-            cur.execute("SELECT b.*, s.name as service_name, ss.slot_date, ss.slot_time FROM bookings b LEFT JOIN services s ON b.service_id = s.id LEFT JOIN service_slots ss ON b.slot_id = ss.id WHERE b.user_id = %d ORDER BY b.created_at DESC" % user['id'])
-        bookings = [dict(r) for r in cur.fetchall()]
+        cur.execute("SELECT b.*, s.name as service_name, ss.slot_date, to_char(ss.slot_time, 'HH24:MI') as slot_time FROM bookings b LEFT JOIN services s ON b.service_id = s.id LEFT JOIN service_slots ss ON b.slot_id = ss.id %s ORDER BY b.created_at DESC, b.id DESC %s" % (('WHERE ' + ' AND '.join(where)) if where else '', limit))
+        bookings = cur.fetchall()
         conn.close()
-        return json_response(200, {'bookings': bookings})
+        result = {'bookings': bookings}
+        if paginate:
+            result['next_cursor'] = None
+            if len(bookings) > page_size:
+                result['bookings'] = bookings = bookings[:page_size]
+                result['next_cursor'] = encode_cursor([bookings[-1]['created_at'], bookings[-1]['id']])
+        return json_response(200, result)
     
-    if method == 'POST':
+    if req.method == 'POST':
         if not user:
             return json_response(401, {'error': 'Не авторизован'})
-        body = json.loads(event.get('body', '{}') or '{}')
+        body = req.body
         service_id = body.get('service_id')
         slot_id = body.get('slot_id')
         name = body.get('name', '')
@@ -305,43 +1069,80 @@ def handle_bookings(event, method):
         if not service_id or not slot_id:
             return json_response(400, {'error': 'Выберите услугу и окошко'})
         
+        age_val = "NULL" if not age else str(int(age))
         conn = get_db()
         cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        cur.execute("SELECT is_booked FROM service_slots WHERE id = %d" % int(slot_id))
-        slot = cur.fetchone()
-        if not slot or slot['is_booked']:
+        cur.execute("WITH claimed AS (UPDATE service_slots SET is_booked = TRUE WHERE id = %d AND service_id = %d AND is_booked = FALSE RETURNING id, service_id) INSERT INTO bookings (service_id, slot_id, user_id, name, phone, email, age, comment) SELECT claimed.service_id, claimed.id, %d, '%s', '%s', '%s', %s, '%s' FROM claimed RETURNING *" % (int(slot_id), int(service_id), user['id'], name.replace("'","''"), phone.replace("'","''"), email.replace("'","''"), age_val, comment.replace("'","''")))
+        booking = cur.fetchone()
+        if not booking:
             conn.close()
-            return json_response(400, {'error': 'Это окошко уже забронировано'})
-        
-        age_val = "NULL" if not age else str(int(age))
-        cur.execute("INSERT INTO bookings (service_id, slot_id, user_id, name, phone, email, age, comment) VALUES (%d, %d, %d, '%s', '%s', '%s', %s, '%s') RETURNING *" % (int(service_id), int(slot_id), user['id'], name.replace("'","''"), phone.replace("'","''"), email.replace("'","''"), age_val, comment.replace("'","''")))
-        booking = dict(cur.fetchone())
-        cur.execute("UPDATE service_slots SET is_booked = TRUE WHERE id = %d" % int(slot_id))
+            return json_response(409, {'error': 'Это окошко уже забронировано'})
+        booking = dict(booking)
         conn.commit()
         conn.close()
+        invalidate_catalog('services/detail', 'availability')
         return json_response(200, {'booking': booking})
     
     return json_response(404, {'error': 'Not found'})
 
-def handle_promotions(event, method):
-    auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
+AVAILABILITY_DEFAULT_DAYS = 7
+AVAILABILITY_MAX_DAYS = 62
+
+def list_availability(params):
+    try:
+        date_from = date.fromisoformat(params.get('from') or date.today().isoformat())
+        date_to = date.fromisoformat(params['to']) if params.get('to') else date_from + timedelta(days=AVAILABILITY_DEFAULT_DAYS - 1)
+    except ValueError:
+        return json_response(400, {'error': 'Даты в формате ГГГГ-ММ-ДД'})
+    if date_to < date_from or (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        return json_response(400, {'error': 'Диапазон не больше %d дней' % AVAILABILITY_MAX_DAYS})
+    
+    where = ["slot_date BETWEEN '%s' AND '%s'" % (date_from.isoformat(), date_to.isoformat())]
+    if params.get('service_id'):
+        where.append("service_id = %d" % int(params['service_id']))
+    if params.get('free', '1') != '0':
+        where.append("is_booked = FALSE")
+    
     conn = get_db()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("SELECT id, service_id, slot_date, to_char(slot_time, 'HH24:MI') AS slot_time, is_booked FROM service_slots WHERE %s ORDER BY slot_date, slot_time, id" % ' AND '.join(where))
+    days = []
+    for r in cur.fetchall():
+        day = r.pop('slot_date').isoformat()
+        if not days or days[-1]['date'] != day:
+            days.append({'date': day, 'slots': []})
+        days[-1]['slots'].append(r)
+    conn.close()
+    return json_response(200, {'from': date_from.isoformat(), 'to': date_to.isoformat(), 'days': days})
+
+@api_route('availability')
+def handle_availability(req):
+    if req.method != 'GET':
+        return json_response(404, {'error': 'Not found'})
+    return catalog_response(req, 'availability', lambda: list_availability(req.params), live=True)
+
+def list_promotions():
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur.execute("SELECT * FROM promotions ORDER BY created_at DESC")
+    promos = cur.fetchall()
+    conn.close()
+    return json_response(200, {'promotions': promos})
+
+@api_route('promotions')
+def handle_promotions(req):
+    if req.method == 'GET':
+        return catalog_response(req, 'promotions', list_promotions)
     
-    if method == 'GET':
-        cur.execute("SELECT * FROM promotions ORDER BY created_at DESC")
-        promos = [dict(r) for r in cur.fetchall()]
-        conn.close()
-        return json_response(200, {'promotions': promos})
-    
-    user = get_user_by_token(auth)
+    user = req.user
     if not user or user['role'] != 'admin':
-        conn.close()
         return json_response(403, {'error': 'Нет доступа'})
     
-    body = json.loads(event.get('body', '{}') or '{}')
+    conn = get_db()
+    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    body = req.body
     
-    if method == 'POST':
+    if req.method == 'POST':
         title = body.get('title', '')
         description = body.get('description', '')
         cover_url = body.get('cover_url', '')
@@ -356,9 +1157,10 @@ def handle_promotions(event, method):
         promo = dict(cur.fetchone())
         conn.commit()
         conn.close()
+        invalidate_catalog()
         return json_response(200, {'promotion': promo})
     
-    if method == 'DELETE':
+    if req.method == 'DELETE':
         promo_id = body.get('id')
         if not promo_id:
             conn.close()
@@ -366,45 +1168,167 @@ def handle_promotions(event, method):
         cur.execute("DELETE FROM promotions WHERE id = %d" % int(promo_id))
         conn.commit()
         conn.close()
+        invalidate_catalog()
         return json_response(200, {'success': True})
     
     conn.close()
     return json_response(404, {'error': 'Not found'})
 
-def handle_chat(event, method):
-    auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
-    user = get_user_by_token(auth)
+CHAT_WAIT_MAX = float(os.environ.get('CHAT_WAIT_MAX', '25'))
+CHAT_WAIT_RECHECK = float(os.environ.get('CHAT_WAIT_RECHECK', '5'))
+CHAT_LISTEN_IDLE = float(os.environ.get('CHAT_LISTEN_IDLE', '60'))
+
+_chat_waiters = {}
+_chat_waiters_lock = threading.Lock()
+_chat_listener = None
+
+def start_chat_listener():
+    """LISTEN идёт в фоновом потоке на отдельном соединении вне пула; поток завершается, когда долго нет ждущих"""
+    global _chat_listener
+    load_psycopg2()
+    with _chat_waiters_lock:
+        if _chat_listener is None or not _chat_listener.is_alive():
+            _chat_listener = threading.Thread(target=listen_chat, name='chat-listen', daemon=True)
+            _chat_listener.start()
+
+def listen_chat():
+    global _chat_listener
+    idle_since = time.monotonic()
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(os.environ['DATABASE_URL'], keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+            conn.autocommit = True
+            conn.cursor().execute("LISTEN chat_messages")
+            while True:
+                if select.select([conn], [], [], CHAT_WAIT_RECHECK) != ([], [], []):
+                    conn.poll()
+                    with _chat_waiters_lock:
+                        for n in conn.notifies:
+                            for woken in _chat_waiters.get(n.payload, ()):
+                                woken.set()
+                    del conn.notifies[:]
+                with _chat_waiters_lock:
+                    if _chat_waiters:
+                        idle_since = time.monotonic()
+                    elif time.monotonic() - idle_since > CHAT_LISTEN_IDLE:
+                        _chat_listener = None
+                        return
+        except (psycopg2.Error, OSError):
+            with _chat_waiters_lock:
+                if not _chat_waiters:
+                    _chat_listener = None
+                    return
+            time.sleep(1)
+        finally:
+            if conn is not None:
+                conn.close()
+
+def fetch_chat_messages(chat_user_id, after_id, wait):
+    """Новые сообщения после after_id; при wait > 0 ждёт NOTIFY, вернув соединение в пул на время ожидания"""
+    query = "SELECT * FROM chat_messages WHERE user_id = %d AND id > %d ORDER BY id ASC" % (chat_user_id, after_id)
+    if wait <= 0:
+        cur = get_db().cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cur.execute(query)
+        return cur.fetchall()
+    deadline = time.monotonic() + min(wait, CHAT_WAIT_MAX)
+    key = str(chat_user_id)
+    woken = threading.Event()
+    with _chat_waiters_lock:
+        _chat_waiters.setdefault(key, set()).add(woken)
+    try:
+        start_chat_listener()
+        while True:
+            cur = get_db().cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cur.execute(query)
+            msgs = cur.fetchall()
+            remaining = deadline - time.monotonic()
+            if msgs or remaining <= 0:
+                return msgs
+            release_db()
+            woken.wait(min(remaining, CHAT_WAIT_RECHECK))
+            woken.clear()
+    finally:
+        with _chat_waiters_lock:
+            _chat_waiters[key].discard(woken)
+            if not _chat_waiters[key]:
+                del _chat_waiters[key]
+
+CHAT_INBOX_PAGE_SIZE = 50
+CHAT_INBOX_PAGE_MAX = 100
+
+def read_watermark(msgs, sender_role, read_up_to):
+    """До какого id отмечать прочтение: последнее непрочитанное сообщение другой стороны в ответе или read_up_to клиента; 0 — писать нечего"""
+    return max([m['id'] for m in msgs if m['sender_role'] == sender_role and not m['is_read']] + [read_up_to])
+
+def mark_chat_read(cur, chat_user_id, sender_role, up_to):
+    """Отмечает прочитанными сообщения другой стороны до up_to; сводка диалога меняется, только если что-то отмечено"""
+    counter = 'unread_by_admin' if sender_role == 'user' else 'unread_by_user'
+    cur.execute("WITH r AS (UPDATE chat_messages SET is_read = TRUE WHERE user_id = %d AND sender_role = '%s' AND is_read = FALSE AND id <= %d RETURNING id) UPDATE chat_conversations SET %s = GREATEST(%s - (SELECT COUNT(*) FROM r), 0) WHERE user_id = %d AND EXISTS (SELECT 1 FROM r)" % (chat_user_id, sender_role, up_to, counter, counter, chat_user_id))
+
+@api_route('chat')
+def handle_chat(req):
+    user = req.user
     if not user:
         return json_response(401, {'error': 'Не авторизован'})
     
     conn = get_db()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    params = event.get('queryStringParameters', {}) or {}
+    params = req.params
     
-    if method == 'GET':
+    if req.method == 'GET':
+        after_id = int(params.get('after_id') or 0)
+        read_up_to = int(params.get('read_up_to') or 0)
+        try:
+            wait = float(params.get('wait') or 0)
+        except ValueError:
+            wait = float('nan')
+        if not math.isfinite(wait):
+            conn.close()
+            return json_response(400, {'error': 'Некорректный параметр wait'})
+        wait = min(max(wait, 0), CHAT_WAIT_MAX)
         if user['role'] == 'admin':
             chat_user_id = params.get('user_id', '')
             if chat_user_id:
-                cur.execute("SELECT * FROM chat_messages WHERE user_id = %d ORDER BY created_at ASC" % int(chat_user_id))
-                msgs = [dict(r) for r in cur.fetchall()]
-                cur.execute("UPDATE chat_messages SET is_read = TRUE WHERE user_id = %d AND sender_role = 'user'" % int(chat_user_id))
-                conn.commit()
+                msgs = fetch_chat_messages(int(chat_user_id), after_id, wait)
+                conn = get_db()
+                cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                up_to = read_watermark(msgs, 'user', read_up_to)
+                if up_to:
+                    mark_chat_read(cur, int(chat_user_id), 'user', up_to)
+                    conn.commit()
                 conn.close()
-                return json_response(200, {'messages': msgs})
-            cur.execute("SELECT DISTINCT ON (cm.user_id) cm.user_id, u.name, u.email, cm.message as last_message, cm.created_at, (SELECT COUNT(*) FROM chat_messages cm2 WHERE cm2.user_id = cm.user_id AND cm2.is_read = FALSE AND cm2.sender_role = 'user') as unread FROM chat_messages cm JOIN users u ON cm.user_id = u.id ORDER BY cm.user_id, cm.created_at DESC")
-            chats = [dict(r) for r in cur.fetchall()]
+                return json_response(200, {'messages': msgs, 'cursor': msgs[-1]['id'] if msgs else after_id})
+            page_size = min(max(int(params.get('limit') or CHAT_INBOX_PAGE_SIZE), 1), CHAT_INBOX_PAGE_MAX)
+            where = ''
+            if params.get('cursor'):
+                try:
+                    last_at, last_user_id = decode_cursor(params['cursor'])
+                    where = "WHERE (c.last_message_at, c.user_id) < (%s, %s)" % (sql_literal('created_at', last_at), sql_literal('id', last_user_id))
+                except (ValueError, TypeError):
+                    conn.close()
+                    return json_response(400, {'error': 'Некорректный курсор'})
+            cur.execute("SELECT c.user_id, u.name, u.email, c.last_message, c.last_message_at as created_at, c.unread_by_admin as unread FROM chat_conversations c JOIN users u ON c.user_id = u.id %s ORDER BY c.last_message_at DESC, c.user_id DESC LIMIT %d" % (where, page_size + 1))
+            chats = cur.fetchall()
             conn.close()
-            return json_response(200, {'chats': chats})
+            next_cursor = None
+            if len(chats) > page_size:
+                chats = chats[:page_size]
+                next_cursor = encode_cursor([chats[-1]['created_at'], chats[-1]['user_id']])
+            return json_response(200, {'chats': chats, 'next_cursor': next_cursor})
         else:
-            cur.execute("SELECT * FROM chat_messages WHERE user_id = %d ORDER BY created_at ASC" % user['id'])
-            msgs = [dict(r) for r in cur.fetchall()]
-            cur.execute("UPDATE chat_messages SET is_read = TRUE WHERE user_id = %d AND sender_role = 'admin'" % user['id'])
-            conn.commit()
+            msgs = fetch_chat_messages(user['id'], after_id, wait)
+            conn = get_db()
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            up_to = read_watermark(msgs, 'admin', read_up_to)
+            if up_to:
+                mark_chat_read(cur, user['id'], 'admin', up_to)
+                conn.commit()
             conn.close()
-            return json_response(200, {'messages': msgs})
+            return json_response(200, {'messages': msgs, 'cursor': msgs[-1]['id'] if msgs else after_id})
     
-    if method == 'POST':
-        body = json.loads(event.get('body', '{}') or '{}')
+    if req.method == 'POST':
+        body = req.body
         message = body.get('message', '').strip()
         if not message:
             conn.close()
@@ -415,11 +1339,13 @@ def handle_chat(event, method):
             if not target_user_id:
                 conn.close()
                 return json_response(400, {'error': 'user_id обязателен'})
-            cur.execute("INSERT INTO chat_messages (user_id, sender_role, message) VALUES (%d, 'admin', '%s') RETURNING *" % (int(target_user_id), message.replace("'","''")))
+            chat_user_id, sender_role = int(target_user_id), 'admin'
         else:
-            cur.execute("INSERT INTO chat_messages (user_id, sender_role, message) VALUES (%d, 'user', '%s') RETURNING *" % (user['id'], message.replace("'","''")))
+            chat_user_id, sender_role = user['id'], 'user'
         
+        cur.execute("WITH m AS (INSERT INTO chat_messages (user_id, sender_role, message) VALUES (%d, '%s', '%s') RETURNING *), c AS (INSERT INTO chat_conversations (user_id, last_message, last_sender_role, last_message_at, unread_by_admin, unread_by_user) SELECT user_id, message, sender_role, created_at, %d, %d FROM m ON CONFLICT (user_id) DO UPDATE SET last_message = EXCLUDED.last_message, last_sender_role = EXCLUDED.last_sender_role, last_message_at = EXCLUDED.last_message_at, unread_by_admin = chat_conversations.unread_by_admin + EXCLUDED.unread_by_admin, unread_by_user = chat_conversations.unread_by_user + EXCLUDED.unread_by_user) SELECT * FROM m" % (chat_user_id, sender_role, message.replace("'","''"), sender_role == 'user', sender_role == 'admin'))
         msg = dict(cur.fetchone())
+        cur.execute("NOTIFY chat_messages, '%d'" % msg['user_id'])
         conn.commit()
         conn.close()
         return json_response(200, {'message': msg})
@@ -427,65 +1353,292 @@ def handle_chat(event, method):
     conn.close()
     return json_response(404, {'error': 'Not found'})
 
-def handle_favorites(event, method):
-    auth = event.get('headers', {}).get('X-Authorization', '') or event.get('headers', {}).get('x-authorization', '')
-    user = get_user_by_token(auth)
+@api_route('favorites')
+def handle_favorites(req):
+    user = req.user
     if not user:
         return json_response(401, {'error': 'Не авторизован'})
     
     conn = get_db()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     
-    if method == 'GET':
-        cur.execute("SELECT s.* FROM favorites f JOIN services s ON f.service_id = s.id WHERE f.user_id = %d ORDER BY f.created_at DESC" % user['id'])
-        favs = [dict(r) for r in cur.fetchall()]
+    if req.method == 'GET':
+        cur.execute("SELECT %s FROM favorites f JOIN services s ON f.service_id = s.id WHERE f.user_id = %d ORDER BY f.created_at DESC" % (', '.join('s.' + c for c in SERVICE_ROW.split(', ')), user['id']))
+        favs = cur.fetchall()
         conn.close()
         return json_response(200, {'favorites': favs})
     
-    body = json.loads(event.get('body', '{}') or '{}')
+    body = req.body
     service_id = body.get('service_id')
     
-    if method == 'POST':
-        cur.execute("SELECT id FROM favorites WHERE user_id = %d AND service_id = %d" % (user['id'], int(service_id)))
-        if cur.fetchone():
-            cur.execute("DELETE FROM favorites WHERE user_id = %d AND service_id = %d" % (user['id'], int(service_id)))
-            conn.commit()
+    if req.method == 'POST':
+        if not service_id:
             conn.close()
-            return json_response(200, {'favorited': False})
-        cur.execute("INSERT INTO favorites (user_id, service_id) VALUES (%d, %d)" % (user['id'], int(service_id)))
+            return json_response(400, {'error': 'service_id обязателен'})
+        favorited = body.get('favorited')
+        if favorited is True:
+            cur.execute("INSERT INTO favorites (user_id, service_id) VALUES (%d, %d) ON CONFLICT (user_id, service_id) DO NOTHING" % (user['id'], int(service_id)))
+        elif favorited is False:
+            cur.execute("DELETE FROM favorites WHERE user_id = %d AND service_id = %d" % (user['id'], int(service_id)))
+        else:
+            cur.execute("WITH del AS (DELETE FROM favorites WHERE user_id = %d AND service_id = %d RETURNING id), ins AS (INSERT INTO favorites (user_id, service_id) SELECT %d, %d WHERE NOT EXISTS (SELECT 1 FROM del) ON CONFLICT (user_id, service_id) DO NOTHING RETURNING id) SELECT EXISTS (SELECT 1 FROM ins) AS favorited" % (user['id'], int(service_id), user['id'], int(service_id)))
+            favorited = cur.fetchone()['favorited']
         conn.commit()
         conn.close()
-        return json_response(200, {'favorited': True})
+        return json_response(200, {'favorited': favorited})
     
     conn.close()
     return json_response(404, {'error': 'Not found'})
 
+BATCH_MAX = 20
+
+@api_route('batch')
+def handle_batch(req):
+    """Несколько запросов за один вызов: общий токен, одно соединение с БД, один ответ"""
+    if req.method != 'POST':
+        return json_response(404, {'error': 'Not found'})
+    subs = batch_requests(req)
+    if subs is None:
+        return json_response(400, {'error': 'Нужно от 1 до %d запросов' % BATCH_MAX})
+    
+    responses = []
+    for sub_id, sub_req, error in subs:
+        if error:
+            responses.append({'id': sub_id, 'status': 400, 'body': {'error': error}})
+            continue
+        try:
+            resp = dispatch(sub_req)
+        except Exception:
+            conn = getattr(_request, 'conn', None)
+            if conn is not None:
+                conn.rollback()
+            resp = None
+        responses.append(batch_result(sub_id, resp))
+    return json_response(200, {'responses': responses})
+
+def batch_requests(req):
+    """Разбирает тело batch в тройки (id, подзапрос, ошибка); None — если список некорректен"""
+    requests = req.body.get('requests') if isinstance(req.body, dict) else None
+    if not isinstance(requests, list) or not requests or len(requests) > BATCH_MAX:
+        return None
+    # Условные заголовки относятся к внешнему ответу: подзапрос с If-None-Match вернул бы 304 без тела
+    headers = {k: v for k, v in req.headers.items() if k.lower() not in ('if-none-match', 'if-modified-since')}
+    subs = []
+    for i, sub in enumerate(requests):
+        if not isinstance(sub, dict) or not isinstance(sub.get('params') or {}, dict) or not isinstance(sub.get('body') or {}, dict):
+            subs.append((sub.get('id', i) if isinstance(sub, dict) else i, None, 'Некорректный подзапрос'))
+            continue
+        route = sub.get('route', '')
+        if not route or not isinstance(route, str) or route == 'batch':
+            subs.append((sub.get('id', i), None, 'Недопустимый маршрут'))
+            continue
+        sub_params = dict(sub.get('params') or {})
+        sub_params['route'] = route
+        subs.append((sub.get('id', i), Request({
+            'httpMethod': sub.get('method', 'GET'),
+            'queryStringParameters': sub_params,
+            'headers': headers,
+        }, sub.get('body') or {}, req), None))
+    return subs
+
+def batch_result(sub_id, resp):
+    if resp is None:
+        return {'id': sub_id, 'status': 500, 'body': {'error': 'Ошибка сервера'}}
+    return {'id': sub_id, 'status': resp['statusCode'], 'body': json.loads(resp['body']) if resp['body'] else None}
+
+_async_pool = None
+_async_loop = None
+_async_loop_pid = None
+_async_loop_lock = threading.Lock()
+_async_driver = None
+
+def async_driver():
+    """psycopg 3 с async-пулом — необязательная зависимость; без неё async_handler работает через потоки"""
+    global _async_driver
+    if _async_driver is None:
+        try:
+            import psycopg
+            import psycopg.rows
+            import psycopg_pool
+            _async_driver = (psycopg, psycopg_pool)
+        except ImportError:
+            _async_driver = False
+    return _async_driver
+
+def async_loop():
+    """Один долгоживущий event loop в фоновом потоке: async-пул живёт на нём, сколько бы циклов ни создавал рантайм"""
+    global _async_loop, _async_loop_pid, _async_pool
+    if _async_loop is None or _async_loop_pid != os.getpid():
+        with _async_loop_lock:
+            if _async_loop is None or _async_loop_pid != os.getpid():
+                import asyncio
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-db', daemon=True).start()
+                _async_pool = None
+                _async_loop, _async_loop_pid = loop, os.getpid()
+    return _async_loop
+
+async def on_async_loop(coro):
+    """Выполняет корутину на цикле async_loop() и ждёт результат из текущего цикла вызова"""
+    import asyncio
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, async_loop()))
+
+async def open_async_pool():
+    psycopg, psycopg_pool = async_driver()
+    pool = psycopg_pool.AsyncConnectionPool(
+        os.environ['DATABASE_URL'], min_size=DB_POOL_MIN, max_size=DB_POOL_MAX, open=False,
+        kwargs={'autocommit': True, 'prepare_threshold': None, 'cursor_factory': psycopg.AsyncClientCursor, 'row_factory': psycopg.rows.dict_row},
+        check=psycopg_pool.AsyncConnectionPool.check_connection, max_lifetime=DB_POOL_MAX_AGE)
+    await pool.open()
+    return pool
+
+async def get_async_pool():
+    """Пул открывается один раз; вызывается только на цикле async_loop(), одновременные вызовы ждут одно открытие"""
+    global _async_pool
+    import asyncio
+    if _async_pool is None:
+        _async_pool = asyncio.ensure_future(open_async_pool())
+    opening = _async_pool
+    try:
+        return await opening
+    except Exception:
+        if _async_pool is opening:
+            _async_pool = None
+        raise
+
+async def run_aquery(sql, one):
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        cur = await conn.execute(sql)
+        rows = await cur.fetchone() if one else await cur.fetchall()
+    return rows, cur.rowcount
+
+async def aquery(sql, one=False):
+    """Один запрос на своём соединении из async-пула — независимые запросы можно запускать через gather"""
+    start = time.perf_counter()
+    rows, rowcount = await on_async_loop(run_aquery(sql, one))
+    stats = current_stats()
+    if stats:
+        stats.record(sql, (time.perf_counter() - start) * 1000, rowcount)
+    return rows
+
+async def async_get_service(service_id):
+    import asyncio
+    service_sql, slots_sql, related_sql = service_detail_queries(service_id)
+    svc, slots, related = await asyncio.gather(aquery(service_sql, one=True), aquery(slots_sql), aquery(related_sql))
+    if not svc:
+        return json_response(404, {'error': 'Услуга не найдена'})
+    svc['slots'] = slots
+    svc['related'] = related
+    return json_response(200, {'service': svc})
+
+async def async_handle_services(req):
+    if req.method != 'GET' or not req.params.get('id'):
+        return None
+    key = catalog_key(req, 'services/detail')
+    entry = catalog_get(key)
+    if entry is None:
+        resp = await async_get_service(int(req.params['id']))
+        if resp['statusCode'] != 200:
+            return resp
+        entry = catalog_put(key, resp['body'], live=True)
+    return catalog_reply(req, entry)
+
+def isolated_dispatch(req):
+    """Подзапрос в своём потоке: своё соединение из пула, освобождается сразу после ответа"""
+    try:
+        return dispatch(req)
+    except Exception:
+        return None
+    finally:
+        release_db()
+
+async def async_handle_batch(req):
+    import asyncio
+    if req.method != 'POST':
+        return None
+    subs = batch_requests(req)
+    if subs is None:
+        return json_response(400, {'error': 'Нужно от 1 до %d запросов' % BATCH_MAX})
+    limit = asyncio.Semaphore(DB_POOL_MAX)
+
+    async def run(sub_id, sub_req, error):
+        if error:
+            return {'id': sub_id, 'status': 400, 'body': {'error': error}}
+        async with limit:
+            return batch_result(sub_id, await asyncio.to_thread(isolated_dispatch, sub_req))
+
+    responses = await asyncio.gather(*(run(sub_id, sub_req, error) for sub_id, sub_req, error in subs))
+    return json_response(200, {'responses': list(responses)})
+
+ASYNC_ROUTES = {
+    'services': async_handle_services,
+    'batch': async_handle_batch,
+}
+
+async def async_handler(event, context):
+    """Асинхронная точка входа: независимые запросы маршрута идут параллельно, пересекающиеся вызовы не блокируют друг друга"""
+    import asyncio
+    req = Request(event)
+    native = ASYNC_ROUTES.get(req.route) if req.method != 'OPTIONS' else None
+    if native is None or not async_driver():
+        return await asyncio.to_thread(handler, event, context)
+    
+    stats = RequestStats()
+    token = _async_stats.set(stats)
+    try:
+        resp = await native(req)
+    finally:
+        _async_stats.reset(token)
+    if resp is None:
+        return await asyncio.to_thread(handle_request, req)
+    return finish_request(resp, stats, req.method, req.route)
+
 def handler(event, context):
     """API маникюрного мастера maninov — авторизация, услуги, бронирование, чат, акции"""
     if event.get('httpMethod') == 'OPTIONS':
         return json_response(200, '')
     
-    method = event.get('httpMethod', 'GET')
-    params = event.get('queryStringParameters', {}) or {}
-    route = params.get('route', '')
-    
-    if not route:
+    req = Request(event)
+    if not req.route:
         return json_response(200, {'status': 'ok', 'service': 'maninov API'})
-    
-    if route.startswith('auth/'):
-        action = route.replace('auth/', '')
-        return handle_auth(event, action)
-    elif route == 'categories':
-        return handle_categories(event, method)
-    elif route == 'services':
-        return handle_services(event, method)
-    elif route == 'bookings':
-        return handle_bookings(event, method)
-    elif route == 'promotions':
-        return handle_promotions(event, method)
-    elif route == 'chat':
-        return handle_chat(event, method)
-    elif route == 'favorites':
-        return handle_favorites(event, method)
-    
-    return json_response(404, {'error': 'Маршрут не найден'})
+    return handle_request(req)
+
+def handle_request(req):
+    _request.stats = RequestStats()
+    try:
+        resp = dispatch(req)
+    finally:
+        release_db()
+        stats, _request.stats = _request.stats, None
+        _request.last_stats = stats
+    return finish_request(resp, stats, req.method, req.route)
+
+def finish_request(resp, stats, method, route):
+    """Структурный лог медленных (и выборочно — обычных) запросов и заголовок Server-Timing"""
+    total_ms = stats.total_ms()
+    if total_ms >= SLOW_REQUEST_MS or (QUERY_LOG_SAMPLE and random.random() < QUERY_LOG_SAMPLE):
+        print(json.dumps({
+            'event': 'slow_request' if total_ms >= SLOW_REQUEST_MS else 'request_sample',
+            'method': method,
+            'route': route,
+            'status': resp['statusCode'],
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(stats.db_ms, 2),
+            'serialize_ms': round(stats.serialize_ms, 2),
+            'queries': len(stats.statements),
+            'rows': sum(max(st['rows'], 0) for st in stats.statements),
+            'statements': stats.statements,
+        }, ensure_ascii=False))
+    if SERVER_TIMING:
+        resp['headers']['Server-Timing'] = 'db;dur=%.2f;desc="%d queries", ser;dur=%.2f, total;dur=%.2f' % (stats.db_ms, len(stats.statements), stats.serialize_ms, total_ms)
+        resp['headers']['Timing-Allow-Origin'] = '*'
+    return resp
+
+def dispatch(req):
+    handle = ROUTES.get(req.route)
+    if handle is None and '/' in req.route:
+        handle = ROUTES.get(req.route.split('/', 1)[0] + '/*')
+    if handle is None:
+        return json_response(404, {'error': 'Маршрут не найден'})
+    return handle(req)
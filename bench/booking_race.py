@@ -0,0 +1,68 @@
+"""Стресс-тест бронирования: много параллельных клиентов бьются за одно окошко, успешен ровно один
+
+Запуск: BENCH_DATABASE_URL=postgresql://localhost/maninov_bench python bench/booking_race.py --clients 50 --rounds 20
+"""
+import sys
+import argparse
+import threading
+import uuid
+from collections import Counter
+import psycopg2
+from localdb import bench_dsn, reset_database, load_api, api_event
+
+def seed(dsn, clients, rounds):
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO services (name, price) VALUES ('Маникюр', 1500) RETURNING id")
+    service_id = cur.fetchone()[0]
+    cur.execute("INSERT INTO service_slots (service_id, slot_date, slot_time) SELECT %d, CURRENT_DATE + g, '10:00' FROM generate_series(1, %d) g RETURNING id" % (service_id, rounds))
+    slot_ids = [r[0] for r in cur.fetchall()]
+    tokens = [uuid.uuid4().hex for _ in range(clients)]
+    cur.execute("INSERT INTO users (email, password_hash, name, token) VALUES %s" % ', '.join("('race%d@test.local', '', 'Клиент %d', '%s')" % (i, i, t) for i, t in enumerate(tokens)))
+    conn.commit()
+    conn.close()
+    return service_id, slot_ids, tokens
+
+def race(api, service_id, slot_id, tokens):
+    barrier = threading.Barrier(len(tokens))
+    statuses = []
+
+    def client(token):
+        event = api_event('bookings', 'POST', token, {'service_id': service_id, 'slot_id': slot_id, 'name': 'Гонка'})
+        barrier.wait()
+        statuses.append(api.handler(event, None)['statusCode'])
+
+    threads = [threading.Thread(target=client, args=(t,)) for t in tokens]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return Counter(statuses)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    dsn = bench_dsn()
+    reset_database(dsn)
+    service_id, slot_ids, tokens = seed(dsn, args.clients, args.rounds)
+    api = load_api(dsn, args.clients)
+
+    failed = 0
+    for n, slot_id in enumerate(slot_ids, 1):
+        statuses = race(api, service_id, slot_id, tokens)
+        conn = psycopg2.connect(dsn)
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM bookings WHERE slot_id = %d" % slot_id)
+        booked = cur.fetchone()[0]
+        conn.close()
+        ok = statuses[200] == 1 and statuses[409] == args.clients - 1 and booked == 1
+        failed += not ok
+        print('раунд %d: %s, броней в БД: %d %s' % (n, dict(statuses), booked, 'OK' if ok else 'FAIL'))
+    print('итог: %d из %d раундов с нарушением' % (failed, len(slot_ids)))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
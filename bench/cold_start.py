@@ -0,0 +1,104 @@
+"""Холодный старт функции: каждый прогон — новый интерпретатор, как после простоя
+
+Для каждого прогона замеряются запуск процесса, импорт index, первый health-check и,
+если задан BENCH_DATABASE_URL, первый запрос к БД (импорт драйвера и открытие пула).
+Печатаются медианы и максимум; --importtime показывает самые дорогие модули импорта.
+
+Запуск: python bench/cold_start.py --runs 20 --json cold_start.json
+С БД:   BENCH_DATABASE_URL=postgresql://localhost/maninov_bench python bench/cold_start.py
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from localdb import ROOT, reset_database
+
+API_DIR = os.path.join(ROOT, 'backend', 'api')
+
+CHILD = """
+import sys, time, json
+started = time.perf_counter()
+sys.path.insert(0, %(api_dir)r)
+import index
+imported = time.perf_counter()
+index.handler({'httpMethod': 'GET', 'queryStringParameters': {}, 'headers': {}}, None)
+health = time.perf_counter()
+result = {
+    'import_ms': (imported - started) * 1000,
+    'health_ms': (health - imported) * 1000,
+    'modules': len(sys.modules),
+    'driver_on_health': 'psycopg2' in sys.modules,
+}
+if %(with_db)r:
+    resp = index.handler({'httpMethod': 'GET', 'queryStringParameters': {'route': 'categories'}, 'headers': {}}, None)
+    result['first_db_ms'] = (time.perf_counter() - health) * 1000
+    result['first_db_status'] = resp['statusCode']
+print(json.dumps(result))
+"""
+
+def run_once(with_db, env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD % {'api_dir': API_DIR, 'with_db': with_db}], env=env, capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1000
+    if out.returncode != 0:
+        sys.exit(out.stderr)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['process_ms'] = wall
+    return result
+
+def import_profile(env, top):
+    """Самые дорогие модули по -X importtime (собственное время, мкс)"""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import sys; sys.path.insert(0, %r); import index' % API_DIR], env=env, capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def median(values):
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10, help='число холодных запусков')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N', help='показать N самых дорогих модулей импорта')
+    parser.add_argument('--json', help='сохранить отчёт в файл для сравнения версий')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if dsn:
+        reset_database(dsn)
+        env['DATABASE_URL'] = dsn
+    runs = [run_once(bool(dsn), env) for _ in range(args.runs)]
+
+    metrics = ['process_ms', 'import_ms', 'health_ms'] + (['first_db_ms'] if dsn else [])
+    report = {'runs': args.runs, 'python': sys.version.split()[0], 'modules': runs[-1]['modules'], 'driver_on_health': any(r['driver_on_health'] for r in runs)}
+    print('%d холодных запусков, Python %s, модулей после импорта: %d' % (args.runs, report['python'], report['modules']))
+    print('%-14s %9s %9s %9s' % ('этап', 'медиана', 'min', 'max'))
+    for metric in metrics:
+        values = [r[metric] for r in runs]
+        report[metric] = {'median': round(median(values), 2), 'min': round(min(values), 2), 'max': round(max(values), 2)}
+        print('%-14s %9.2f %9.2f %9.2f' % (metric, report[metric]['median'], report[metric]['min'], report[metric]['max']))
+    if report['driver_on_health']:
+        print('внимание: psycopg2 импортируется уже на health-check')
+    if dsn and any(r['first_db_status'] != 200 for r in runs):
+        print('внимание: первый запрос к БД вернул %s' % sorted(set(r['first_db_status'] for r in runs)))
+
+    if args.importtime:
+        report['importtime'] = [{'module': name, 'self_us': self_us, 'cumulative_us': cumulative_us} for self_us, cumulative_us, name in import_profile(env, args.importtime)]
+        print('\n%-40s %10s %10s' % ('модуль', 'своё мкс', 'всего мкс'))
+        for row in report['importtime']:
+            print('%-40s %10d %10d' % (row['module'], row['self_us'], row['cumulative_us']))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""Нагрузочный прогон API в процессе: handler(event, context) против локальной PostgreSQL
+
+База собирается из db_migrations и заполняется данными реалистичного объёма, затем
+воспроизводится смешанная нагрузка по маршрутам на нескольких уровнях параллельности.
+Для каждого маршрута печатаются p50/p95/p99, запросов к БД на вызов и RPS.
+
+Запуск: BENCH_DATABASE_URL=postgresql://localhost/maninov_bench python bench/load.py --scale 1 --concurrency 1,8 --requests 2000 --json bench_output.json
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+from localdb import bench_dsn, reset_database, load_api, api_event
+
+def seed(dsn, scale):
+    users = 2000 * scale
+    services = 200 * scale
+    chat_users = 500 * scale
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO users (email, password_hash, name, role, token) VALUES ('bench-admin@test.local', '', 'Админ', 'admin', 'bench-admin-token')")
+    cur.execute("INSERT INTO users (email, password_hash, name, phone, token) SELECT 'user' || g || '@test.local', '', 'Клиент ' || g, '+7900' || lpad(g::text, 7, '0'), 'bench-token-' || g FROM generate_series(1, %d) g" % users)
+    cur.execute("INSERT INTO categories (name, sort_order) SELECT 'Раздел ' || g, g FROM generate_series(1, 8) g")
+    cur.execute("INSERT INTO services (category_id, name, description, price, photos, is_popular, created_at) SELECT 2 + g %% 8, 'Услуга ' || g, repeat('Покрытие гель-лаком, укрепление, дизайн. ', 10), 800 + (g * 37) %% 4000, '[\"https://cdn.example.com/' || g || '/1.jpg\", \"https://cdn.example.com/' || g || '/2.jpg\", \"https://cdn.example.com/' || g || '/3.jpg\"]', g %% 7 = 0, NOW() - (g || ' hours')::interval FROM generate_series(1, %d) g" % services)
+    cur.execute("UPDATE services SET search_vector = setweight(to_tsvector('russian', name), 'A') || setweight(to_tsvector('russian', description), 'B')")
+    cur.execute("INSERT INTO service_slots (service_id, slot_date, slot_time) SELECT s.id, CURRENT_DATE + d, make_time(10 + h, 0, 0) FROM services s, generate_series(-7, 30) d, generate_series(0, 7) h")
+    cur.execute("WITH picked AS (SELECT id, service_id, row_number() OVER () AS n FROM service_slots WHERE random() < 0.1 LIMIT %d), claimed AS (UPDATE service_slots ss SET is_booked = TRUE FROM picked WHERE ss.id = picked.id RETURNING picked.*) INSERT INTO bookings (service_id, slot_id, user_id, name, phone, status, created_at) SELECT service_id, id, 3 + n %% %d, 'Клиент', '+79000000000', (ARRAY['pending', 'confirmed', 'cancelled'])[1 + n %% 3], NOW() - (n || ' minutes')::interval FROM claimed" % (5000 * scale, users))
+    cur.execute("INSERT INTO chat_messages (user_id, sender_role, message, is_read, created_at) SELECT 3 + g %% %d, CASE WHEN g %% 3 = 0 THEN 'admin' ELSE 'user' END, 'Сообщение номер ' || g, g %% 5 <> 0, NOW() - ((40000 * %d - g) || ' seconds')::interval FROM generate_series(1, 40000 * %d) g" % (chat_users, scale, scale))
+    cur.execute("INSERT INTO chat_conversations (user_id, last_message, last_sender_role, last_message_at, unread_by_admin, unread_by_user) SELECT DISTINCT ON (cm.user_id) cm.user_id, cm.message, cm.sender_role, cm.created_at, (SELECT COUNT(*) FROM chat_messages x WHERE x.user_id = cm.user_id AND x.is_read = FALSE AND x.sender_role = 'user'), (SELECT COUNT(*) FROM chat_messages x WHERE x.user_id = cm.user_id AND x.is_read = FALSE AND x.sender_role = 'admin') FROM chat_messages cm ORDER BY cm.user_id, cm.created_at DESC, cm.id DESC")
+    cur.execute("INSERT INTO favorites (user_id, service_id) SELECT DISTINCT 3 + (g * 7) %% %d, 1 + (g * 13) %% %d FROM generate_series(1, %d) g" % (users, services, 5000 * scale))
+    cur.execute("INSERT INTO promotions (title, description, end_date) SELECT 'Акция ' || g, 'Скидка на покрытие', CURRENT_DATE + g FROM generate_series(1, 20) g")
+    cur.execute("ANALYZE")
+    cur.execute("SELECT id, service_id FROM service_slots WHERE is_booked = FALSE AND slot_date >= CURRENT_DATE ORDER BY random() LIMIT 20000")
+    free_slots = cur.fetchall()
+    conn.commit()
+    conn.close()
+    return {'users': users, 'services': services, 'chat_users': chat_users, 'free_slots': free_slots}
+
+def workload(data):
+    """Смесь маршрутов с весами; каждая функция строит событие для handler"""
+    rnd = random.Random()
+    free_slots = list(data['free_slots'])
+    slots_lock = threading.Lock()
+
+    def token():
+        return 'bench-token-%d' % rnd.randint(1, data['users'])
+
+    def chat_token():
+        return 'bench-token-%d' % rnd.randint(1, data['chat_users'])
+
+    def service_id():
+        return rnd.randint(1, data['services'])
+
+    def book():
+        with slots_lock:
+            slot_id, svc_id = free_slots.pop() if free_slots else (1, 1)
+        return api_event('bookings', 'POST', token(), {'service_id': svc_id, 'slot_id': slot_id, 'name': 'Нагрузка', 'phone': '+79000000000'})
+
+    return [
+        ('GET services card', 25, lambda: api_event('services', params={'view': 'card', 'sort': rnd.choice(['new', 'popular', 'cheap', 'expensive'])})),
+        ('GET services full', 5, lambda: api_event('services', params={'sort': 'new'})),
+        ('GET service detail', 15, lambda: api_event('services', params={'id': str(service_id())})),
+        ('GET search', 5, lambda: api_event('search', params={'q': rnd.choice(['гель-лак', 'укрепление', 'дизайн ногтей', 'покрытие']), 'price_max': str(rnd.choice([1500, 3000, 5000]))})),
+        ('GET categories', 10, lambda: api_event('categories')),
+        ('GET promotions', 8, lambda: api_event('promotions')),
+        ('GET availability', 10, lambda: api_event('availability', params={'service_id': str(service_id())})),
+        ('GET auth/me', 8, lambda: api_event('auth/me', token=token())),
+        ('GET bookings', 5, lambda: api_event('bookings', token=token())),
+        ('GET chat', 6, lambda: api_event('chat', token=chat_token())),
+        ('GET chat inbox', 3, lambda: api_event('chat', token='bench-admin-token')),
+        ('GET favorites', 3, lambda: api_event('favorites', token=token())),
+        ('POST bookings', 2, book),
+        ('POST chat', 2, lambda: api_event('chat', 'POST', chat_token(), {'message': 'Нагрузочное сообщение'})),
+        ('POST favorites', 2, lambda: api_event('favorites', 'POST', token(), {'service_id': service_id()})),
+    ]
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+def run(api, mix, concurrency, total):
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    builders = {m[0]: m[2] for m in mix}
+    plan = random.choices(names, weights, k=total)
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def one(name):
+        event = builders[name]()
+        start = time.perf_counter()
+        resp = api.handler(event, None)
+        elapsed = (time.perf_counter() - start) * 1000
+        stats = api._request.last_stats
+        with lock:
+            samples[name].append((elapsed, len(stats.statements), stats.db_ms))
+            if resp['statusCode'] >= 500:
+                errors[name] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, plan))
+    wall = time.perf_counter() - start
+
+    report = {'concurrency': concurrency, 'requests': total, 'seconds': round(wall, 3), 'rps': round(total / wall, 1), 'routes': {}}
+    for name in names:
+        rows = samples.get(name)
+        if not rows:
+            continue
+        latencies = [r[0] for r in rows]
+        report['routes'][name] = {
+            'count': len(rows),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': round(sum(r[1] for r in rows) / float(len(rows)), 2),
+            'db_ms': round(sum(r[2] for r in rows) / float(len(rows)), 2),
+            'rps': round(len(rows) / wall, 1),
+            'errors': errors.get(name, 0),
+        }
+    return report
+
+def print_report(report):
+    print('\nпараллельность %(concurrency)d: %(requests)d запросов за %(seconds).2f с, %(rps).1f RPS' % report)
+    print('%-22s %7s %9s %9s %9s %8s %8s %8s %6s' % ('маршрут', 'вызовов', 'p50 мс', 'p95 мс', 'p99 мс', 'запр/выз', 'БД мс', 'RPS', 'ошибок'))
+    for name, r in report['routes'].items():
+        print('%-22s %7d %9.2f %9.2f %9.2f %8.2f %8.2f %8.1f %6d' % (name, r['count'], r['p50_ms'], r['p95_ms'], r['p99_ms'], r['queries'], r['db_ms'], r['rps'], r['errors']))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=1, help='множитель объёма данных')
+    parser.add_argument('--concurrency', default='1,8', help='уровни параллельности через запятую')
+    parser.add_argument('--requests', type=int, default=2000, help='вызовов на каждый уровень')
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--no-cache', action='store_true', help='отключить кэш каталога (CATALOG_CACHE_TTL=0)')
+    parser.add_argument('--json', help='сохранить отчёт в файл для сравнения версий')
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    if args.no_cache:
+        import os
+        os.environ['CATALOG_CACHE_TTL'] = '0'
+    dsn = bench_dsn()
+    reset_database(dsn)
+    data = seed(dsn, args.scale)
+    api = load_api(dsn, max(levels))
+    mix = workload(data)
+
+    run(api, mix, 1, args.warmup)
+    reports = [run(api, mix, level, args.requests) for level in levels]
+    for report in reports:
+        print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'scale': args.scale, 'runs': reports}, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
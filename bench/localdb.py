@@ -0,0 +1,43 @@
+"""Локальная PostgreSQL для нагрузочных скриптов: схема из db_migrations, API импортируется в процесс"""
+import os
+import re
+import json
+import sys
+import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def bench_dsn():
+    dsn = os.environ.get('BENCH_DATABASE_URL')
+    if not dsn:
+        sys.exit('BENCH_DATABASE_URL не задан: укажите пустую локальную БД, её схема public будет пересоздана')
+    return dsn
+
+def migrations():
+    files = glob.glob(os.path.join(ROOT, 'db_migrations', 'V*__*.sql'))
+    return sorted(files, key=lambda f: int(re.match(r'V(\d+)__', os.path.basename(f)).group(1)))
+
+def reset_database(dsn):
+    import psycopg2
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute("DROP SCHEMA public CASCADE")
+    cur.execute("CREATE SCHEMA public")
+    for path in migrations():
+        with open(path, encoding='utf-8') as f:
+            cur.execute(f.read())
+    conn.close()
+
+def load_api(dsn, pool_size):
+    os.environ['DATABASE_URL'] = dsn
+    os.environ['DB_POOL_MAX'] = str(pool_size)
+    sys.path.insert(0, os.path.join(ROOT, 'backend', 'api'))
+    import index
+    return index
+
+def api_event(route, method='GET', token=None, body=None, params=None):
+    query = {'route': route}
+    query.update(params or {})
+    headers = {'X-Authorization': 'Bearer %s' % token} if token else {}
+    return {'httpMethod': method, 'queryStringParameters': query, 'headers': headers, 'body': json.dumps(body) if body is not None else ''}
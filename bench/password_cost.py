@@ -0,0 +1,75 @@
+"""Подбор стоимости хеширования паролей под бюджет задержки входа
+
+Меряет текущие хешеры из backend/api/index.py и печатает параметр, при котором
+одна проверка пароля укладывается в бюджет даже при N одновременных входах,
+когда одновременно считается не больше PASSWORD_HASH_WORKERS хешей.
+
+Запуск: python bench/password_cost.py --budget-ms 250 --concurrent-logins 4
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend', 'api'))
+import index
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def measure_concurrent(fn, logins):
+    """Время последнего из N одновременных входов при ограничителе хешера"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=logins) as pool:
+        list(pool.map(lambda _: index.run_hashing(fn), range(logins)))
+    return (time.perf_counter() - start) * 1000
+
+def pick_pbkdf2(budget_ms, logins, repeat):
+    probe = 50000
+    per_iteration = measure(lambda: index.Pbkdf2Hasher(probe).encode('password'), repeat) / probe
+    waves = -(-logins // index.PASSWORD_HASH_WORKERS)
+    iterations = int(budget_ms / waves / per_iteration) // 10000 * 10000
+    iterations = max(iterations, 10000)
+    hasher = index.Pbkdf2Hasher(iterations)
+    single = measure(lambda: hasher.encode('password'), repeat)
+    burst = measure_concurrent(lambda: hasher.encode('password'), logins)
+    return 'PASSWORD_PBKDF2_ITERATIONS=%d' % iterations, single, burst
+
+def pick_scrypt(budget_ms, logins, repeat):
+    waves = -(-logins // index.PASSWORD_HASH_WORKERS)
+    best = None
+    n = 1 << 12
+    while n <= 1 << 20:
+        hasher = index.ScryptHasher(n)
+        single = measure(lambda: hasher.encode('password'), repeat)
+        if single * waves > budget_ms:
+            break
+        best = (n, single)
+        n <<= 1
+    if best is None:
+        return 'PASSWORD_SCRYPT_N=%d (бюджет недостижим)' % (1 << 12), single, None
+    hasher = index.ScryptHasher(best[0])
+    burst = measure_concurrent(lambda: hasher.encode('password'), logins)
+    return 'PASSWORD_SCRYPT_N=%d' % best[0], best[1], burst
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-ms', type=float, default=250, help='допустимое время хеширования при входе')
+    parser.add_argument('--concurrent-logins', type=int, default=index.PASSWORD_HASH_WORKERS, help='одновременных входов в одном тёплом экземпляре')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('бюджет %.0f мс, одновременных входов %d, потоков хеширования %d' % (args.budget_ms, args.concurrent_logins, index.PASSWORD_HASH_WORKERS))
+    for name, pick in (('pbkdf2_sha256', pick_pbkdf2), ('scrypt', pick_scrypt)):
+        setting, single, burst = pick(args.budget_ms, args.concurrent_logins, args.repeat)
+        print('%-14s %-40s один хеш %7.1f мс, пачка %s' % (name, setting, single, '%.1f мс' % burst if burst else '—'))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+CREATE INDEX idx_chat_messages_user_id_id ON chat_messages (user_id, id);
@@ -0,0 +1 @@
+CREATE INDEX idx_users_token ON users (token);
@@ -0,0 +1,6 @@
+CREATE INDEX idx_services_created_at_id ON services (created_at, id);
+CREATE INDEX idx_services_price_id ON services (price, id);
+CREATE INDEX idx_services_popular_created_at_id ON services (is_popular, created_at, id);
+CREATE INDEX idx_services_category_created_at_id ON services (category_id, created_at, id);
+CREATE INDEX idx_services_category_price_id ON services (category_id, price, id);
+CREATE INDEX idx_services_category_popular_created_at_id ON services (category_id, is_popular, created_at, id);
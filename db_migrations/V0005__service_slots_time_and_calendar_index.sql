@@ -0,0 +1,4 @@
+ALTER TABLE service_slots ALTER COLUMN slot_time TYPE TIME USING slot_time::time;
+
+CREATE INDEX idx_service_slots_service_date_booked ON service_slots (service_id, slot_date, is_booked);
+CREATE INDEX idx_service_slots_date_booked ON service_slots (slot_date, is_booked);
@@ -0,0 +1,21 @@
+CREATE TABLE chat_conversations (
+    user_id INT PRIMARY KEY REFERENCES users(id) ON UPDATE CASCADE,
+    last_message TEXT NOT NULL DEFAULT '',
+    last_sender_role VARCHAR(20) NOT NULL DEFAULT 'user',
+    last_message_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    unread_by_admin INT NOT NULL DEFAULT 0,
+    unread_by_user INT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX idx_chat_conversations_last_message_at ON chat_conversations (last_message_at, user_id);
+
+INSERT INTO chat_conversations (user_id, last_message, last_sender_role, last_message_at, unread_by_admin, unread_by_user)
+SELECT DISTINCT ON (cm.user_id)
+    cm.user_id,
+    cm.message,
+    cm.sender_role,
+    cm.created_at,
+    (SELECT COUNT(*) FROM chat_messages x WHERE x.user_id = cm.user_id AND x.is_read = FALSE AND x.sender_role = 'user'),
+    (SELECT COUNT(*) FROM chat_messages x WHERE x.user_id = cm.user_id AND x.is_read = FALSE AND x.sender_role = 'admin')
+FROM chat_messages cm
+ORDER BY cm.user_id, cm.created_at DESC, cm.id DESC;
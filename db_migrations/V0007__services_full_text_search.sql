@@ -0,0 +1,6 @@
+ALTER TABLE services ADD COLUMN search_vector tsvector;
+
+UPDATE services
+SET search_vector = setweight(to_tsvector('russian', coalesce(name, '')), 'A') || setweight(to_tsvector('russian', coalesce(description, '')), 'B');
+
+CREATE INDEX idx_services_search_vector ON services USING GIN (search_vector);
@@ -0,0 +1,4 @@
+CREATE INDEX idx_bookings_user_created_at ON bookings (user_id, created_at, id);
+CREATE INDEX idx_bookings_status_created_at ON bookings (status, created_at, id);
+CREATE INDEX idx_bookings_service_created_at ON bookings (service_id, created_at, id);
+CREATE INDEX idx_bookings_created_at ON bookings (created_at, id);
@@ -12,7 +12,13 @@ export function clearToken() {
   localStorage.removeItem("token");
 }
 
-async function request(route: string, method = "GET", body?: unknown, extraParams?: Record<string, string>) {
+async function request(
+  route: string,
+  method = "GET",
+  body?: unknown,
+  extraParams?: Record<string, string>,
+  cache?: RequestCache,
+) {
   const params = new URLSearchParams({ route, ...extraParams });
   const url = `${API_URL}?${params.toString()}`;
   const headers: Record<string, string> = {
@@ -25,13 +31,32 @@ async function request(route: string, method = "GET", body?: unknown, extraParam
     method,
     headers,
     body: body ? JSON.stringify(body) : undefined,
+    cache,
   });
   const data = await res.json();
   if (!res.ok) throw new Error(data.error || "Ошибка сервера");
   return data;
 }
 
+export interface BatchRequest {
+  id?: string;
+  route: string;
+  method?: string;
+  params?: Record<string, string>;
+  body?: unknown;
+}
+
+export interface BatchResponse {
+  id: string | number;
+  status: number;
+  body: Record<string, unknown> | null;
+}
+
 export const api = {
+  batch: (requests: BatchRequest[]): Promise<{ responses: BatchResponse[] }> =>
+    request("batch", "POST", { requests }),
+
+
   login: (email: string, password: string) =>
     request("auth/login", "POST", { email, password }),
   register: (email: string, password: string, name: string) =>
@@ -40,34 +65,58 @@ export const api = {
   updateProfile: (data: Record<string, string>) =>
     request("auth/update-profile", "POST", data),
 
-  getCategories: () => request("categories", "GET"),
+  getCategories: (fresh?: boolean) =>
+    request("categories", "GET", undefined, undefined, fresh ? "no-store" : undefined),
   addCategory: (name: string) => request("categories", "POST", { name }),
   deleteCategory: (id: number) => request("categories", "DELETE", { id }),
 
-  getServices: (params?: Record<string, string>) =>
-    request("services", "GET", undefined, params),
-  getService: (id: number) =>
-    request("services", "GET", undefined, { id: String(id) }),
+  getServices: (params?: Record<string, string>, fresh?: boolean) =>
+    request("services", "GET", undefined, params, fresh ? "no-store" : undefined),
+  getService: (id: number, fresh?: boolean) =>
+    request("services", "GET", undefined, { id: String(id) }, fresh ? "no-store" : undefined),
+  searchServices: (params: Record<string, string>) =>
+    request("search", "GET", undefined, params),
   addService: (data: unknown) => request("services", "POST", data),
   updateService: (data: unknown) => request("services", "PUT", data),
   deleteService: (id: number) => request("services", "DELETE", { id }),
 
-  getBookings: () => request("bookings", "GET"),
+  getAvailability: (params: { service_id?: number; from?: string; to?: string; free?: boolean }) =>
+    request("availability", "GET", undefined, {
+      ...(params.service_id ? { service_id: String(params.service_id) } : {}),
+      ...(params.from ? { from: params.from } : {}),
+      ...(params.to ? { to: params.to } : {}),
+      ...(params.free === false ? { free: "0" } : {}),
+    }),
+
+  getBookings: (params?: Record<string, string>) =>
+    request("bookings", "GET", undefined, params),
+  getBookingsSummary: (params?: Record<string, string>) =>
+    request("bookings/summary", "GET", undefined, params),
   createBooking: (data: unknown) => request("bookings", "POST", data),
 
-  getPromotions: () => request("promotions", "GET"),
+  getPromotions: (fresh?: boolean) =>
+    request("promotions", "GET", undefined, undefined, fresh ? "no-store" : undefined),
   addPromotion: (data: unknown) => request("promotions", "POST", data),
   deletePromotion: (id: number) => request("promotions", "DELETE", { id }),
 
-  getChats: () => request("chat", "GET"),
-  getChatMessages: (userId: number) =>
-    request("chat", "GET", undefined, { user_id: String(userId) }),
+  getChats: (afterId?: number) =>
+    request("chat", "GET", undefined, afterId ? { after_id: String(afterId) } : undefined),
+  getChatInbox: (cursor?: string) =>
+    request("chat", "GET", undefined, cursor ? { cursor } : undefined),
+  getChatMessages: (userId: number, afterId?: number) =>
+    request("chat", "GET", undefined, {
+      user_id: String(userId),
+      ...(afterId ? { after_id: String(afterId) } : {}),
+    }),
   sendMessage: (data: { message: string; user_id?: number }) =>
     request("chat", "POST", data),
 
   getFavorites: () => request("favorites", "GET"),
-  toggleFavorite: (serviceId: number) =>
-    request("favorites", "POST", { service_id: serviceId }),
+  toggleFavorite: (serviceId: number, favorited?: boolean) =>
+    request("favorites", "POST", {
+      service_id: serviceId,
+      ...(favorited === undefined ? {} : { favorited }),
+    }),
 };
 
 export default api;
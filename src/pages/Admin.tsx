@@ -94,7 +94,7 @@ function ServicesTab() {
   const fetchData = useCallback(async () => {
     setLoading(true);
     try {
-      const [sData, cData] = await Promise.all([api.getServices(), api.getCategories()]);
+      const [sData, cData] = await Promise.all([api.getServices(undefined, true), api.getCategories(true)]);
       setServices(sData.services || []);
       setCategories(cData.categories || []);
     } catch {
@@ -295,7 +295,7 @@ function CategoriesTab() {
   const fetchCats = useCallback(async () => {
     setLoading(true);
     try {
-      const data = await api.getCategories();
+      const data = await api.getCategories(true);
       setCategories(data.categories || []);
     } catch {
       /* silent */
@@ -402,7 +402,7 @@ function PromotionsTab() {
   const fetchPromos = useCallback(async () => {
     setLoading(true);
     try {
-      const data = await api.getPromotions();
+      const data = await api.getPromotions(true);
       setPromotions(data.promotions || []);
     } catch {
       /* silent */
@@ -523,14 +523,31 @@ function PromotionsTab() {
 function BookingsTab() {
   const [bookings, setBookings] = useState<Booking[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     api.getBookings()
-      .then((data) => setBookings(data.bookings || []))
+      .then((data) => {
+        setBookings(data.bookings || []);
+        setNextCursor(data.next_cursor || null);
+      })
       .catch(() => {})
       .finally(() => setLoading(false));
   }, []);
 
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    api.getBookings({ cursor: nextCursor })
+      .then((data) => {
+        setBookings((prev) => [...prev, ...(data.bookings || [])]);
+        setNextCursor(data.next_cursor || null);
+      })
+      .catch(() => {})
+      .finally(() => setLoadingMore(false));
+  };
+
   const statusLabel = (status: string) => {
     if (status === "confirmed") return { text: "Подтв.", cls: "bg-[#8cc63f]/10 text-[#8cc63f]" };
     if (status === "cancelled") return { text: "Отмена", cls: "bg-red-500/10 text-red-400" };
@@ -588,6 +605,17 @@ function BookingsTab() {
               </tbody>
             </table>
           </div>
+          {nextCursor && (
+            <div className="flex justify-center border-t border-white/[0.04] py-3">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="font-body text-xs uppercase tracking-wider text-white/40 hover:text-[#d4a843] transition-colors duration-300"
+              >
+                {loadingMore ? <Icon name="Loader2" size={14} className="animate-spin" /> : "Показать ещё"}
+              </button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -605,18 +633,45 @@ function ChatsTab() {
   const [sending, setSending] = useState(false);
   const bottomRef = useRef<HTMLDivElement>(null);
   const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const cursorRef = useRef(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const fetchInbox = useCallback(
+    () =>
+      api.getChatInbox()
+        .then((data) => {
+          setChats(data.chats || []);
+          setNextCursor(data.next_cursor || null);
+        })
+        .catch(() => {}),
+    [],
+  );
 
   useEffect(() => {
-    api.getChats()
-      .then((data) => setChats(data.chats || []))
+    fetchInbox().finally(() => setLoading(false));
+  }, [fetchInbox]);
+
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    api.getChatInbox(nextCursor)
+      .then((data) => {
+        setChats((prev) => [...prev, ...(data.chats || []).filter((c: ChatPreview) => !prev.some((p) => p.user_id === c.user_id))]);
+        setNextCursor(data.next_cursor || null);
+      })
       .catch(() => {})
-      .finally(() => setLoading(false));
-  }, []);
+      .finally(() => setLoadingMore(false));
+  };
 
   const fetchMessages = useCallback(async (userId: number) => {
     try {
-      const data = await api.getChatMessages(userId);
-      setMessages(data.messages || []);
+      const data = await api.getChatMessages(userId, cursorRef.current);
+      const fresh: ChatMessage[] = data.messages || [];
+      if (fresh.length > 0) {
+        setMessages((prev) => [...prev, ...fresh.filter((m) => !prev.some((p) => p.id === m.id))]);
+      }
+      cursorRef.current = data.cursor ?? cursorRef.current;
     } catch {
       /* silent */
     }
@@ -625,6 +680,7 @@ function ChatsTab() {
   const openChat = (userId: number) => {
     setActiveUserId(userId);
     setMessages([]);
+    cursorRef.current = 0;
     setMsgLoading(true);
     fetchMessages(userId).finally(() => setMsgLoading(false));
 
@@ -661,9 +717,7 @@ function ChatsTab() {
     setActiveUserId(null);
     setMessages([]);
     if (intervalRef.current) clearInterval(intervalRef.current);
-    api.getChats()
-      .then((data) => setChats(data.chats || []))
-      .catch(() => {});
+    fetchInbox();
   };
 
   const activeChat = chats.find((c) => c.user_id === activeUserId);
@@ -707,6 +761,17 @@ function ChatsTab() {
                 )}
               </button>
             ))}
+            {nextCursor && (
+              <div className="flex justify-center py-3">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="font-body text-xs uppercase tracking-wider text-white/40 hover:text-[#d4a843] transition-colors duration-300"
+                >
+                  {loadingMore ? <Icon name="Loader2" size={14} className="animate-spin" /> : "Показать ещё"}
+                </button>
+              </div>
+            )}
           </div>
         )
       ) : (
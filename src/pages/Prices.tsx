@@ -1,7 +1,7 @@
 import { useState, useEffect } from "react";
 import { Link } from "react-router-dom";
 import { useAuth } from "@/lib/auth";
-import { api } from "@/lib/api";
+import { api, type BatchRequest } from "@/lib/api";
 import { Button } from "@/components/ui/button";
 import Icon from "@/components/ui/icon";
 import Navbar from "@/components/Navbar";
@@ -15,7 +15,7 @@ interface Service {
   id: number;
   name: string;
   price: number;
-  photos: string;
+  photo: string | null;
   category_id: number;
   category_name?: string;
 }
@@ -27,15 +27,6 @@ const sortOptions = [
   { key: "expensive", label: "Дорогие" },
 ];
 
-function parsePhotos(photos: string): string[] {
-  try {
-    const parsed = JSON.parse(photos);
-    return Array.isArray(parsed) ? parsed : [];
-  } catch {
-    return [];
-  }
-}
-
 function Prices() {
   const { user } = useAuth();
   const [categories, setCategories] = useState<Category[]>([]);
@@ -44,34 +35,55 @@ function Prices() {
   const [activeCategory, setActiveCategory] = useState<number | null>(null);
   const [activeSort, setActiveSort] = useState("new");
   const [favoriteIds, setFavoriteIds] = useState<Set<number>>(new Set());
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
-    api.getCategories()
-      .then((data) => setCategories(data.categories || []))
+    const requests: BatchRequest[] = [{ id: "categories", route: "categories" }];
+    if (user) requests.push({ id: "favorites", route: "favorites" });
+    api.batch(requests)
+      .then(({ responses }) => {
+        for (const r of responses) {
+          if (r.status !== 200 || !r.body) continue;
+          if (r.id === "categories") setCategories((r.body.categories as Category[]) || []);
+          if (r.id === "favorites") {
+            const ids = ((r.body.favorites as { id: number }[]) || []).map((f) => f.id);
+            setFavoriteIds(new Set(ids));
+          }
+        }
+      })
       .catch(() => {});
-  }, []);
-
-  useEffect(() => {
-    if (user) {
-      api.getFavorites()
-        .then((data) => {
-          const ids = (data.favorites || []).map((f: { service_id: number }) => f.service_id);
-          setFavoriteIds(new Set(ids));
-        })
-        .catch(() => {});
-    }
   }, [user]);
 
+  const listParams = () => {
+    const params: Record<string, string> = { sort: activeSort, view: "card" };
+    if (activeCategory) params.category_id = String(activeCategory);
+    return params;
+  };
+
   useEffect(() => {
     setLoading(true);
-    const params: Record<string, string> = { sort: activeSort };
-    if (activeCategory) params.category_id = String(activeCategory);
-    api.getServices(params)
-      .then((data) => setServices(data.services || []))
+    api.getServices(listParams())
+      .then((data) => {
+        setServices(data.services || []);
+        setNextCursor(data.next_cursor || null);
+      })
       .catch(() => {})
       .finally(() => setLoading(false));
   }, [activeCategory, activeSort]);
 
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    api.getServices({ ...listParams(), cursor: nextCursor })
+      .then((data) => {
+        setServices((prev) => [...prev, ...(data.services || [])]);
+        setNextCursor(data.next_cursor || null);
+      })
+      .catch(() => {})
+      .finally(() => setLoadingMore(false));
+  };
+
   const handleToggleFavorite = async (serviceId: number) => {
     if (!user) return;
     try {
@@ -158,8 +170,7 @@ function Prices() {
         ) : (
           <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-6">
             {services.map((service) => {
-              const photos = parsePhotos(service.photos);
-              const cover = photos[0] || null;
+              const cover = service.photo || null;
               const isFav = favoriteIds.has(service.id);
 
               return (
@@ -218,6 +229,19 @@ function Prices() {
             })}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="flex justify-center mt-10">
+            <Button
+              onClick={loadMore}
+              disabled={loadingMore}
+              variant="ghost"
+              className="font-body text-xs uppercase tracking-wider text-white/50 hover:text-[#d4a843] hover:bg-[#d4a843]/5 px-6"
+            >
+              {loadingMore ? <Icon name="Loader2" size={16} className="animate-spin" /> : "Показать ещё"}
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -86,7 +86,7 @@ function ServiceDetail() {
     if (!user || !id) return;
     api.getFavorites()
       .then((data) => {
-        const ids = (data.favorites || []).map((f: { service_id: number }) => f.service_id);
+        const ids = (data.favorites || []).map((f: { id: number }) => f.id);
         setIsFav(ids.includes(Number(id)));
       })
       .catch(() => {});
@@ -136,7 +136,7 @@ function ServiceDetail() {
       setDialogOpen(false);
       setSelectedSlot(null);
       setBookComment("");
-      const updated = await api.getService(service.id);
+      const updated = await api.getService(service.id, true);
       setService(updated.service);
     } catch (err: unknown) {
       toast({
@@ -23,6 +23,7 @@ function Support() {
   const [sending, setSending] = useState(false);
   const bottomRef = useRef<HTMLDivElement>(null);
   const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const cursorRef = useRef(0);
 
   useEffect(() => {
     if (!authLoading && !user) {
@@ -32,8 +33,12 @@ function Support() {
 
   const fetchMessages = async () => {
     try {
-      const data = await api.getChats();
-      setMessages(data.messages || []);
+      const data = await api.getChats(cursorRef.current);
+      const fresh: Message[] = data.messages || [];
+      if (fresh.length > 0) {
+        setMessages((prev) => [...prev, ...fresh.filter((m) => !prev.some((p) => p.id === m.id))]);
+      }
+      cursorRef.current = data.cursor ?? cursorRef.current;
     } catch {
       /* silent */
     }